@@ -1,13 +1,16 @@
 import streamlit as st
 import boto3
+import asyncio
 import json
-import tempfile
+import re
+import hashlib
+import functools
+import time
 import os
-from botocore.exceptions import NoCredentialsError, ClientError
-from PyPDF2 import PdfReader
-import uuid
-from datetime import datetime
-from io import BytesIO
+import urllib.parse
+import urllib.request
+from botocore.config import Config
+from botocore.exceptions import NoCredentialsError, ClientError, UnknownServiceError
 
 # ==== STREAMLIT APP CONFIGURATION ====
 st.set_page_config(
@@ -20,7 +23,103 @@ st.set_page_config(
 # Make bucket name configurable
 DEFAULT_S3_BUCKET = 'pruebafinal1'  
 
+# Bedrock runtime client settings - a connection pool large enough for the
+# concurrent requests, adaptive retries that back off when throttled, a fast
+# failing connect and a read timeout long enough for streamed generations
+BEDROCK_CLIENT_SETTINGS = {
+    "max_pool_connections": 32,
+    "retries": {"max_attempts": 8, "mode": "adaptive"},
+    "connect_timeout": 3,
+    "read_timeout": 120,
+    "tcp_keepalive": True
+}
+
+# Cross-region inference profile prefix for each region's geography
+CROSS_REGION_PREFIXES = {"us": "us", "eu": "eu", "ap": "apac"}
+
 # ==== AWS SETUP AND CONFIGURATION ====
+@st.cache_resource
+def build_aws_clients(profile_name, aws_region):
+    """Create the boto3 session and clients once per profile and region"""
+    if profile_name:
+        session = boto3.Session(profile_name=profile_name, region_name=aws_region)
+    else:
+        # Use environment variables or default credentials
+        session = boto3.Session(region_name=aws_region)
+    
+    # Initialize S3 client
+    s3 = session.client("s3")
+    
+    # Initialize Bedrock clients - separate clients for runtime and management.
+    # Creating a client directly is cheaper than loading the full service list,
+    # and raises UnknownServiceError when botocore doesn't know the service
+    
+    # Boto3 clients are thread-safe: this one client is shared by every call in
+    # the process and never rebuilt per request, so its connections are reused
+    try:
+        bedrock_runtime = session.client("bedrock-runtime", config=Config(**BEDROCK_CLIENT_SETTINGS))
+    except UnknownServiceError:
+        bedrock_runtime = None
+        
+    try:
+        bedrock = session.client("bedrock")
+    except UnknownServiceError:
+        bedrock = None
+    
+    return session, s3, bedrock_runtime, bedrock
+
+@st.cache_data(ttl=600, show_spinner=False)
+def list_foundation_models(_bedrock, profile_name, aws_region):
+    """Fetch the Bedrock text model summaries, refreshed at most every few minutes"""
+    # Filtering server-side keeps image/embedding models out of the response
+    response = _bedrock.list_foundation_models(byOutputModality="TEXT")
+    return response.get('modelSummaries', [])
+
+@st.cache_data(ttl=600, show_spinner=False)
+def list_inference_profiles(_bedrock, profile_name, aws_region):
+    """Map model IDs to their cross-region inference profile for the region's geography"""
+    # System profiles are named after the geography, e.g. us.anthropic.claude-...
+    geography = CROSS_REGION_PREFIXES.get(aws_region.split("-")[0])
+    if not geography:
+        return {}
+    
+    profiles = {}
+    paginator = _bedrock.get_paginator("list_inference_profiles")
+    try:
+        for page in paginator.paginate(typeEquals="SYSTEM_DEFINED"):
+            for summary in page.get("inferenceProfileSummaries", []):
+                profile_id = summary.get("inferenceProfileId", "")
+                if profile_id.startswith(f"{geography}."):
+                    profiles[profile_id[len(geography) + 1:]] = profile_id
+    except ClientError:
+        # Without bedrock:ListInferenceProfiles models are invoked directly. The
+        # empty map is cached, so the denied call isn't repeated on every rerun
+        return {}
+    return profiles
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_model_status(_bedrock, model_id, profile_name, aws_region):
+    """Lifecycle status of the selected model, or None if unknown, refreshed at most once a minute"""
+    # Inference profile IDs carry a geography prefix the model lookup doesn't accept
+    geography, _, base_id = model_id.partition(".")
+    if geography not in CROSS_REGION_PREFIXES.values():
+        base_id = model_id
+    try:
+        details = _bedrock.get_foundation_model(modelIdentifier=base_id)["modelDetails"]
+    except Exception:
+        # No permission to describe models or an unlisted ID. Returning instead
+        # of raising lets the cache throttle failed probes too
+        return None
+    return details.get("modelLifecycle", {}).get("status", "ACTIVE")
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_account_id(_session, profile_name, aws_region):
+    """AWS account of the current credentials, or None if it can't be looked up"""
+    try:
+        return _session.client("sts").get_caller_identity()["Account"]
+    except Exception:
+        return None
+
 def setup_aws_clients():
     """Set up and test AWS clients with proper error handling"""
     st.sidebar.header("AWS Configuration")
@@ -32,32 +131,18 @@ def setup_aws_clients():
     s3_bucket = st.sidebar.text_input("S3 Bucket Name", DEFAULT_S3_BUCKET)
     
     # Initialize session and clients
+    profile_name = None
     try:
         if st.sidebar.checkbox("Use AWS Profile", value=True):
             profile_name = st.sidebar.text_input("AWS Profile Name", "recruitment-assistant")
-            session = boto3.Session(profile_name=profile_name, region_name=aws_region)
-        else:
-            # Use environment variables or default credentials
-            session = boto3.Session(region_name=aws_region)
         
-        # Initialize S3 client
-        s3 = session.client("s3")
-        
-        # Initialize Bedrock clients - separate clients for runtime and management
-        bedrock_runtime = None
-        bedrock = None
+        # Clients are cached, reruns reuse them instead of rebuilding the session
+        session, s3, bedrock_runtime, bedrock = build_aws_clients(profile_name, aws_region)
         
-        # Check if bedrock is available in this region
-        available_services = session.get_available_services()
-        
-        if "bedrock-runtime" in available_services:
-            bedrock_runtime = session.client("bedrock-runtime")
-        else:
+        if not bedrock_runtime:
             st.sidebar.warning(f"⚠️ Bedrock Runtime not available in region {aws_region}")
             
-        if "bedrock" in available_services:
-            bedrock = session.client("bedrock")
-        else:
+        if not bedrock:
             st.sidebar.warning(f"⚠️ Bedrock management API not available in region {aws_region}")
             
         # Test S3 connection
@@ -98,11 +183,21 @@ def setup_aws_clients():
             except Exception as e:
                 st.sidebar.error(f"❌ S3 connection failed: {str(e)}")
                 
+        # Fetch the model list once, both the listing and the selectbox use it
+        model_summaries = None
+        models_error = None
+        if bedrock:
+            try:
+                model_summaries = list_foundation_models(bedrock, profile_name, aws_region)
+            except Exception as e:
+                models_error = e
+        
         # Display available bedrock models (if connected)
         if bedrock and st.sidebar.button("List Available Bedrock Models"):
-            try:
-                response = bedrock.list_foundation_models()
-                model_list = [model.get('modelId') for model in response.get('modelSummaries', [])[:10]]
+            if models_error:
+                st.sidebar.error(f"❌ Error listing models: {str(models_error)}")
+            else:
+                model_list = [model.get('modelId') for model in model_summaries[:10]]
                 
                 if model_list:
                     st.sidebar.success("✅ Found the following Bedrock models:")
@@ -110,17 +205,13 @@ def setup_aws_clients():
                         st.sidebar.info(f"- {model}")
                 else:
                     st.sidebar.warning("No models found or you don't have access to any models")
-                    
-            except Exception as e:
-                st.sidebar.error(f"❌ Error listing models: {str(e)}")
                 
         # Let user select a model if bedrock is available
         model_id = None
         if bedrock_runtime and bedrock:
             try:
-                # Fetch list of models from Bedrock
-                response = bedrock.list_foundation_models()
-                model_summaries = response.get('modelSummaries', [])
+                if models_error:
+                    raise models_error
                 model_names = [model.get('modelId') for model in model_summaries]
 
                 # Check if models are available
@@ -152,18 +243,47 @@ def setup_aws_clients():
                     model_id = selected_model
                 else:
                     model_id = None
+        
+        # Invoke through the cross-region inference profile when the model has
+        # one, it spreads requests across regions instead of one region's quota
+        if model_id and bedrock:
+            try:
+                inference_profile = list_inference_profiles(bedrock, profile_name, aws_region).get(model_id)
+            except Exception:
+                inference_profile = None
+            if inference_profile:
+                model_id = inference_profile
+                st.sidebar.caption(f"Using cross-region inference profile {inference_profile}")
                 
-        return session, s3, bedrock_runtime, bedrock, model_id, aws_region, s3_bucket
+        return session, s3, bedrock_runtime, bedrock, model_id, aws_region, s3_bucket, profile_name
     
     except NoCredentialsError:
         st.sidebar.error("❌ No AWS credentials found. Please configure AWS credentials.")
-        return None, None, None, None, None, aws_region, s3_bucket
+        return None, None, None, None, None, aws_region, s3_bucket, profile_name
     except Exception as e:
         st.sidebar.error(f"❌ Error setting up AWS: {str(e)}")
-        return None, None, None, None, None, aws_region, s3_bucket
+        return None, None, None, None, None, aws_region, s3_bucket, profile_name
 
 # Initialize AWS clients
-session, s3, bedrock_runtime, bedrock, MODEL_ID, AWS_REGION, S3_BUCKET = setup_aws_clients()
+session, s3, bedrock_runtime, bedrock, MODEL_ID, AWS_REGION, S3_BUCKET, AWS_PROFILE = setup_aws_clients()
+
+# Responses are only written to the bucket when the user asks for it, and
+# only to a bucket owned by the account of the current credentials
+S3_RESPONSE_CACHE = bool(s3 and S3_BUCKET) and st.sidebar.checkbox(
+    "Keep responses in the S3 bucket",
+    value=False,
+    help="Store model responses under cache/ in the S3 bucket so they are reused after a restart and by other sessions"
+)
+S3_ACCOUNT_ID = get_account_id(session, AWS_PROFILE, AWS_REGION) if S3_RESPONSE_CACHE else None
+if S3_RESPONSE_CACHE and not S3_ACCOUNT_ID:
+    st.sidebar.warning("⚠️ Couldn't confirm the AWS account, responses are not stored in S3")
+
+# Only applied to models that support latency-optimized inference
+LATENCY_OPTIMIZED = st.sidebar.checkbox(
+    "Latency-optimized inference",
+    value=True,
+    help="Request Bedrock's latency-optimized inference on supported models"
+)
 
 # ==== MAIN CONTENT ====
 st.title("AI-Powered Text Analysis Assistant")
@@ -180,80 +300,829 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
 ])
 
 # ==== HELPER FUNCTION FOR BEDROCK REQUESTS ====
-def call_bedrock_model(prompt, model_id):
+# Seconds a cached model response stays valid, in memory and in S3
+RESPONSE_CACHE_TTL = 24 * 3600
+
+# Responses kept in memory, the oldest are dropped first
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+# Models that accept cachePoint blocks for Bedrock prompt caching
+PROMPT_CACHING_MODELS = (
+    "claude-3-5-haiku",
+    "claude-3-7-sonnet",
+    "claude-sonnet-4",
+    "claude-opus-4",
+    "claude-haiku-4",
+    "nova"
+)
+
+# Bedrock ignores cache points after fewer than about 1,024 tokens (2,048 on
+# Claude 3.5 Haiku), prefix lengths are estimated at 4 characters per token
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_MIN_TOKENS_BY_MODEL = {"claude-3-5-haiku": 2048}
+CHARS_PER_TOKEN = 4
+
+# Models that support tool use through the Converse API, and the subset that
+# can be forced to call a specific tool
+TOOL_USE_MODELS = (
+    "claude-3",
+    "claude-sonnet-4",
+    "claude-opus-4",
+    "claude-haiku-4",
+    "nova",
+    "mistral-large",
+    "llama3-1",
+    "llama3-2",
+    "llama3-3",
+    "command-r"
+)
+TOOL_CHOICE_MODELS = ("claude", "nova", "mistral-large")
+
+# Models that accept performanceConfig latency "optimized"
+LATENCY_OPTIMIZED_MODELS = (
+    "claude-3-5-haiku",
+    "llama3-1-70b",
+    "llama3-1-405b",
+    "nova-pro"
+)
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide cache of model responses, shared across reruns and sessions"""
+    return {}
+
+def response_cache_key(prompt, model_id, prefix=None):
+    """Hash a prompt for the response cache, ignoring whitespace-only differences"""
+    normalized_prompt = " ".join(f"{prefix or ''}\n{prompt}".split())
+    digest = hashlib.blake2b(f"{model_id}\n{normalized_prompt}".encode("utf-8"), digest_size=16).hexdigest()
+    # Keys are grouped by model so the S3 copy can be browsed or cleared per model
+    return f"{model_id}/{digest}"
+
+def response_cache_object_key(cache_key):
+    return f"cache/{cache_key}.json"
+
+def load_s3_cached_response(cache_key):
+    """Fetch a persisted (created, result) pair from the S3 bucket, or None if missing or unavailable"""
+    if not S3_RESPONSE_CACHE or not S3_ACCOUNT_ID:
+        return None
+    try:
+        obj = s3.get_object(
+            Bucket=S3_BUCKET,
+            Key=response_cache_object_key(cache_key),
+            ExpectedBucketOwner=S3_ACCOUNT_ID
+        )
+        stored = json.loads(obj["Body"].read())
+        return float(stored["created"]), str(stored["result"])
+    except Exception:
+        # A miss, a missing bucket, missing permissions or a malformed object
+        # all just mean no cached copy
+        return None
+
+def save_s3_cached_response(cache_key, created, result):
+    """Persist a response to the S3 bucket so it survives restarts, best effort"""
+    if not S3_RESPONSE_CACHE or not S3_ACCOUNT_ID:
+        return
+    try:
+        s3.put_object(
+            Bucket=S3_BUCKET,
+            ExpectedBucketOwner=S3_ACCOUNT_ID,
+            Key=response_cache_object_key(cache_key),
+            Body=json.dumps({"created": created, "result": result}).encode("utf-8"),
+            ContentType="application/json"
+        )
+    except Exception:
+        pass
+
+def remember_response(cache_key, created, result):
+    """Add a response to the in-memory cache, evicting the oldest past the size limit"""
+    cache = get_response_cache()
+    cache[cache_key] = (created, result)
+    # Dicts keep insertion order, so the first key is the oldest entry
+    while len(cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)), None)
+
+def unexpired_response(cached):
+    """Return the response of a (created, result) entry unless it has expired"""
+    if cached and time.time() - cached[0] < RESPONSE_CACHE_TTL:
+        return cached[1]
+    return None
+
+def get_cached_response(cache_key):
+    """Return a cached response that has not expired, or None"""
+    cached = get_response_cache().get(cache_key)
+    if cached is None:
+        # Fall back to the copy persisted by an earlier run or another session
+        cached = load_s3_cached_response(cache_key)
+        if cached:
+            remember_response(cache_key, *cached)
+    return unexpired_response(cached)
+
+def store_cached_response(cache_key, result):
+    created = time.time()
+    remember_response(cache_key, created, result)
+    save_s3_cached_response(cache_key, created, result)
+
+def prefix_is_cacheable(prefix, model_id):
+    """Whether a cache point after this prefix can take effect on the model"""
+    model = model_id.lower()
+    if not any(name in model for name in PROMPT_CACHING_MODELS):
+        return False
+    min_tokens = next(
+        (tokens for name, tokens in PROMPT_CACHE_MIN_TOKENS_BY_MODEL.items() if name in model),
+        PROMPT_CACHE_MIN_TOKENS
+    )
+    return len(prefix) >= min_tokens * CHARS_PER_TOKEN
+
+def build_converse_request(prompt, model_id, prefix=None, max_tokens=2000):
+    """Build the Converse API arguments, the same shape for every model family"""
+    content = []
+    if prefix:
+        # The shared prefix goes first, followed by a cache point on supported
+        # models when it is long enough to be cached, so only the short prompt
+        # after it is reprocessed
+        content.append({"text": prefix})
+        if prefix_is_cacheable(prefix, model_id):
+            content.append({"cachePoint": {"type": "default"}})
+    content.append({"text": prompt})
+    
+    # Llama models reject generation lengths above 2048 tokens
+    if "llama" in model_id.lower():
+        max_tokens = min(max_tokens, 2048)
+    
+    request = {
+        "modelId": model_id,
+        "messages": [{"role": "user", "content": content}],
+        "inferenceConfig": {"maxTokens": max_tokens}
+    }
+    if LATENCY_OPTIMIZED and any(name in model_id.lower() for name in LATENCY_OPTIMIZED_MODELS):
+        request["performanceConfig"] = {"latency": "optimized"}
+    return request
+
+# Shown in place of an empty reply
+NO_CONTENT = "No content returned"
+
+def parse_converse_response(response):
+    """Join the text blocks of a Converse response"""
+    content = response.get("output", {}).get("message", {}).get("content", [])
+    return "".join(block.get("text", "") for block in content) or NO_CONTENT
+
+# Only complete answers are cached, empty, filtered or cut-off replies are
+# asked again on the next request
+CACHEABLE_STOP_REASONS = ("end_turn", "stop_sequence")
+
+def is_cacheable(result, stop_reason):
+    return stop_reason in CACHEABLE_STOP_REASONS and bool(result.strip()) and result != NO_CONTENT
+
+# Start of every error message returned in place of a model response
+BEDROCK_ERROR_PREFIX = "Error calling model:"
+
+def is_bedrock_error(result):
+    return result.startswith(BEDROCK_ERROR_PREFIX)
+
+# Appended to responses the model stopped at the token limit, which are never cached
+TRUNCATED_NOTE = "\n\n⚠️ The response was cut off at the model's length limit."
+
+def is_truncated(result):
+    return result.endswith(TRUNCATED_NOTE)
+
+def format_bedrock_error(error):
+    return f"{BEDROCK_ERROR_PREFIX} {str(error)}\n\nTroubleshooting tips:\n1. Check if you have access to the selected model\n2. Verify your AWS credentials have proper permissions\n3. Make sure Bedrock is available in your region"
+
+def call_bedrock_model(prompt, model_id, prefix=None, max_tokens=2000, use_cache=True):
     """Generic function to call Bedrock models with proper error handling"""
+    # Prompts sharing a long leading block (usually the user's text) pass it as
+    # prefix so Bedrock can reuse it between calls instead of reprocessing it
     if not bedrock_runtime or not model_id:
         return "⚠️ Bedrock runtime client not available or no model selected. Please configure AWS properly."
     
+    # Repeated prompts are answered from the cache without calling Bedrock,
+    # unless a fresh answer was asked for (it still replaces the cached one)
+    cache_key = response_cache_key(prompt, model_id, prefix)
+    cached = get_cached_response(cache_key) if use_cache else None
+    if cached is not None:
+        return cached
+    
     try:
-        # Check which model family we're using
-        if "claude" in model_id.lower():
-            # Claude models
-            body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 2000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
-        elif "titan" in model_id.lower():
-            # Amazon Titan models
-            body = json.dumps({
-                "inputText": prompt,
-                "textGenerationConfig": {
-                    "maxTokenCount": 2000,
-                    "temperature": 0.7,
-                    "topP": 0.9
-                }
-            })
-        elif "llama" in model_id.lower():
-            # Meta Llama models
-            body = json.dumps({
-                "prompt": prompt,
-                "max_gen_len": 2000,
-                "temperature": 0.7,
-                "top_p": 0.9
-            })
+        response = bedrock_runtime.converse(**build_converse_request(prompt, model_id, prefix, max_tokens))
+        result = parse_converse_response(response)
+    except Exception as e:
+        # Errors are returned to the user but never cached
+        return format_bedrock_error(e)
+    
+    if response.get("stopReason") == "max_tokens":
+        return result + TRUNCATED_NOTE
+    if is_cacheable(result, response.get("stopReason")):
+        store_cached_response(cache_key, result)
+    return result
+
+def call_bedrock_model_stream(prompt, model_id, placeholder, prefix=None, max_tokens=2000, language=None):
+    """Stream a model response into a Streamlit placeholder and return the full text"""
+    # Code output is shown as a highlighted block instead of rendered markdown
+    def render(text):
+        if language:
+            placeholder.code(text, language=language)
         else:
-            # Generic format for other models
-            body = json.dumps({
-                "prompt": prompt,
-                "max_tokens": 2000
-            })
-
-        response = bedrock_runtime.invoke_model(
-            modelId=model_id,
-            body=body,
-            accept="application/json",
-            contentType="application/json"
-        )
-        
-        response_body = json.loads(response.get('body').read().decode('utf-8'))
+            placeholder.markdown(text)
+    
+    if not bedrock_runtime or not model_id:
+        message = "⚠️ Bedrock runtime client not available or no model selected. Please configure AWS properly."
+        placeholder.markdown(message)
+        return message
+    
+    cache_key = response_cache_key(prompt, model_id, prefix)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        render(cached)
+        return cached
+    
+    result = ""
+    stop_reason = None
+    try:
+        response = bedrock_runtime.converse_stream(**build_converse_request(prompt, model_id, prefix, max_tokens))
+        # Render each delta as it arrives so the user sees output at first token
+        for event in response["stream"]:
+            if "contentBlockDelta" in event:
+                result += event["contentBlockDelta"]["delta"].get("text", "")
+                render(result)
+            elif "messageStop" in event:
+                stop_reason = event["messageStop"].get("stopReason")
+    except Exception as e:
+        message = format_bedrock_error(e)
+        placeholder.markdown(message)
+        return message
+    
+    if stop_reason == "max_tokens":
+        result += TRUNCATED_NOTE
+        render(result)
+        return result
+    # Filtered or empty answers are shown as they are but not kept
+    if is_cacheable(result, stop_reason):
+        store_cached_response(cache_key, result)
+    return result
+
+def call_bedrock_model_tool(prompt, model_id, tool_spec, prefix=None, max_tokens=2000, validate=None):
+    """Have the model answer through a tool and return the tool input, or None"""
+    # None means no structured answer was given (unsupported model, error, a
+    # plain text reply or an input rejected by validate), callers then fall
+    # back to a text prompt. validate returns the cleaned input or None
+    if not bedrock_runtime or not model_id or not any(name in model_id.lower() for name in TOOL_USE_MODELS):
+        return None
+    
+    cache_key = response_cache_key(f"{tool_spec['name']}\n{prompt}", model_id, prefix)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        try:
+            result = json.loads(cached)
+        except ValueError:
+            result = None
+        if result is not None and validate:
+            result = validate(result)
+        if result is not None:
+            return result
+    
+    request = build_converse_request(prompt, model_id, prefix, max_tokens)
+    request["toolConfig"] = {"tools": [{"toolSpec": tool_spec}]}
+    if any(name in model_id.lower() for name in TOOL_CHOICE_MODELS):
+        request["toolConfig"]["toolChoice"] = {"tool": {"name": tool_spec["name"]}}
+    
+    try:
+        response = bedrock_runtime.converse(**request)
+    except Exception:
+        return None
+    
+    for block in response.get("output", {}).get("message", {}).get("content", []):
+        if "toolUse" in block:
+            result = block["toolUse"].get("input", {})
+            if validate:
+                result = validate(result)
+            # Malformed inputs are never cached, the fallback answers instead
+            if result is None:
+                return None
+            # The cache holds strings, so the tool input is stored as JSON
+            store_cached_response(cache_key, json.dumps(result))
+            return result
+    return None
+
+# ==== ASYNC BEDROCK REQUESTS ====
+# aioboto3 is only imported once a tab first needs concurrent requests, so
+# the initial page load doesn't pay for the async stack
+@st.cache_resource
+def get_async_session(profile_name, aws_region):
+    """aioboto3 session using the same credentials as the sidebar configuration"""
+    # Sessions are not tied to an event loop, so one per profile and region
+    # is kept and only the clients are opened per batch
+    import aioboto3
+    return aioboto3.Session(profile_name=profile_name, region_name=aws_region)
+
+def async_bedrock_client():
+    """Async context manager for a bedrock-runtime client with the shared settings"""
+    from aiobotocore.config import AioConfig
+    # Async clients are bound to the running event loop, so one is opened per
+    # batch of requests and shared by all of them
+    return get_async_session(AWS_PROFILE, AWS_REGION).client("bedrock-runtime", config=AioConfig(**BEDROCK_CLIENT_SETTINGS))
+
+async def get_cached_response_async(cache_key):
+    """Async variant of get_cached_response, the S3 lookup runs in a worker thread"""
+    # boto3 calls block, awaiting them in a thread lets concurrent requests overlap
+    cached = get_response_cache().get(cache_key)
+    if cached is None:
+        cached = await asyncio.to_thread(load_s3_cached_response, cache_key)
+        if cached:
+            remember_response(cache_key, *cached)
+    return unexpired_response(cached)
+
+async def store_cached_response_async(cache_key, result):
+    created = time.time()
+    remember_response(cache_key, created, result)
+    await asyncio.to_thread(save_s3_cached_response, cache_key, created, result)
+
+async def call_bedrock_model_async(prompt, model_id, prefix=None, max_tokens=2000, client=None):
+    """Async variant of call_bedrock_model, shares its response cache"""
+    if not bedrock_runtime or not model_id:
+        return "⚠️ Bedrock runtime client not available or no model selected. Please configure AWS properly."
+    
+    cache_key = response_cache_key(prompt, model_id, prefix)
+    cached = await get_cached_response_async(cache_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        if client is None:
+            async with async_bedrock_client() as client:
+                return await call_bedrock_model_async(prompt, model_id, prefix, max_tokens, client)
         
-        # Extract response based on model
-        if "claude" in model_id.lower():
-            # Claude models response format
-            return response_body.get("content", [{}])[0].get("text", "No content returned")
-        elif "titan" in model_id.lower():
-            # Titan models response format
-            return response_body.get("results", [{}])[0].get("outputText", "No content returned")
-        else:
-            # Generic fallback - try common response formats
-            if "generated_text" in response_body:
-                return response_body["generated_text"]
-            elif "completion" in response_body:
-                return response_body["completion"]
-            else:
-                # Return the whole response for debugging
-                return f"Response received but format unknown: {json.dumps(response_body, indent=2)}"
-            
+        response = await client.converse(**build_converse_request(prompt, model_id, prefix, max_tokens))
+        result = parse_converse_response(response)
     except Exception as e:
-        return f"Error calling model: {str(e)}\n\nTroubleshooting tips:\n1. Check if you have access to the selected model\n2. Verify your AWS credentials have proper permissions\n3. Make sure Bedrock is available in your region"
+        return format_bedrock_error(e)
+    
+    if response.get("stopReason") == "max_tokens":
+        return result + TRUNCATED_NOTE
+    if is_cacheable(result, response.get("stopReason")):
+        await store_cached_response_async(cache_key, result)
+    return result
+
+# ==== RESPONSE PARSING ====
+# Headings the corrections prompt asks for, mapped to their result keys
+CORRECTION_MARKERS = {
+    "SPELLING CORRECTIONS:": "spelling",
+    "GRAMMAR CORRECTIONS:": "grammar",
+    "COHERENCE CORRECTIONS:": "coherence",
+    "STYLE CORRECTIONS:": "style",
+    "ORDER CORRECTIONS:": "order",
+    "PROPOSED CORRECTION:": "proposed"
+}
+
+# Delimiters the hypothesis details prompt asks for, mapped to their result keys
+HYPOTHESIS_MARKERS = {
+    "===STATISTICS===": "statistics",
+    "===REFERENCES===": "references",
+    "===OUTLINE===": "outline"
+}
+
+# Headings the evaluation prompt asks for, mapped to their result keys
+EVALUATION_MARKERS = {
+    "SPELLING EVALUATION:": "spelling",
+    "GRAMMAR EVALUATION:": "grammar",
+    "STYLE EVALUATION:": "style",
+    "COHERENCE EVALUATION:": "coherence",
+    "OVERALL EVALUATION:": "overall"
+}
+
+# Result boxes shown for each parsed section, in display order
+CORRECTION_TYPES = (
+    ("spelling", "Spelling Corrections"),
+    ("grammar", "Grammar Corrections"),
+    ("coherence", "Coherence Corrections"),
+    ("style", "Style Corrections"),
+    ("order", "Order Corrections"),
+    ("proposed", "Proposed Corrected Text")
+)
+
+EVALUATION_SECTIONS = (
+    ("spelling", "Spelling Evaluation"),
+    ("grammar", "Grammar Evaluation"),
+    ("style", "Style Evaluation"),
+    ("coherence", "Coherence Evaluation"),
+    ("overall", "Overall Evaluation")
+)
+
+@functools.lru_cache(maxsize=32)
+def marker_pattern(markers):
+    """Compile one alternation regex for a tuple of section headings"""
+    # A single pattern scans the response once instead of once per heading.
+    # Headings only count at the start of a line, optionally wrapped in
+    # markdown bold or heading marks
+    return re.compile(r"^[ \t#*]*(" + "|".join(map(re.escape, markers)) + r")[ \t*]*", re.MULTILINE)
+
+def split_sections(text, marker_to_key, missing_text=None):
+    """Split a response on its section headings and map each section's content to its key"""
+    sections = {}
+    # Each section runs from the end of its heading to the start of the next one
+    matches = list(marker_pattern(tuple(marker_to_key)).finditer(text))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        content = text[match.end():next_match.start() if next_match else None]
+        sections.setdefault(marker_to_key[match.group(1)], content.strip())
+    
+    # Fill in any missing sections
+    if missing_text is not None:
+        for key in marker_to_key.values():
+            sections.setdefault(key, missing_text)
+    return sections
+
+def parse_json_sections(response, keys, missing_text):
+    """Read section texts from a JSON model response, tolerating code fences and stray text"""
+    # Models often wrap the object in prose or ```json fences, keep the outermost braces
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    try:
+        data = json.loads(match.group(0) if match else response, strict=False)
+    except ValueError:
+        # Malformed JSON - pull out each "key": "value" pair individually
+        data = {}
+        for key in keys:
+            value_match = re.search(rf'"{key}"\s*:\s*"((?:[^"\\]|\\.)*)"', response, re.DOTALL)
+            if value_match:
+                try:
+                    data[key] = json.loads(f'"{value_match.group(1)}"', strict=False)
+                except ValueError:
+                    data[key] = value_match.group(1)
+    
+    if not isinstance(data, dict) or not data:
+        # Nothing parseable (e.g. an error message), show the raw response in every section
+        return {key: response for key in keys}
+    
+    # In a response cut off at the length limit, absent sections were never
+    # written rather than missing from the text
+    truncated = is_truncated(response)
+    sections = {}
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        if value:
+            sections[key] = str(value).strip()
+        elif truncated:
+            sections[key] = "⚠️ This section was cut off at the model's length limit. Try again with a shorter text."
+        else:
+            sections[key] = missing_text(key)
+    return sections
+
+# ==== PROMPT TEMPLATES ====
+# Built once at import and filled with str.format, so only the variable parts
+# change between calls
+ANALYSIS_SECTIONS = (
+    "hypothesis", "main_bullet_points", "most_important_data_points", 
+    "summary", "abstract", "introduction", "body_text", "conclusion", "appendix"
+)
+SECTION_PRETTY = {section: section.replace('_', ' ') for section in ANALYSIS_SECTIONS}
+SECTION_TITLES = {section: pretty.title() for section, pretty in SECTION_PRETTY.items()}
+
+# Every tab sends the user's text first as an identical document block, so a
+# text long enough to be cached reuses one prompt prefix across tabs and clicks
+DOCUMENT_PREFIX_TEMPLATE = """
+[DOC {doc_id}]
+{text}
+[END DOC]
+"""
+
+ANALYSIS_SECTIONS_PROMPT = """
+Analyze the document above and generate each of these sections: {section_names}.
+
+Return only a JSON object with exactly these keys: {section_keys}.
+Each value must be a string containing only that section for this text. Be concise and relevant.
+
+If the text doesn't contain a clear section, set its value to: "This text doesn't contain a [section name]."
+""".format(
+    section_names=", ".join(SECTION_PRETTY.values()),
+    section_keys=", ".join(f'"{section}"' for section in ANALYSIS_SECTIONS)
+)
+
+CORRECTIONS_PROMPT = """
+Analyze the document above for various corrections and improvements.
+
+Please provide analysis in the following format:
+
+SPELLING CORRECTIONS:
+[Evaluate spelling, identify errors, and provide suggestions]
+
+GRAMMAR CORRECTIONS:
+[Evaluate grammar, identify errors, and provide suggestions]
+
+COHERENCE CORRECTIONS:
+[Evaluate coherence, identify errors, and provide suggestions]
+
+STYLE CORRECTIONS:
+[Evaluate style, identify errors, and provide suggestions]
+
+ORDER CORRECTIONS:
+[Evaluate the order of ideas in the document, identify errors, and provide suggestions]
+
+PROPOSED CORRECTION:
+[Provide a corrected version of the text that addresses all the above issues to make it clearer]
+"""
+
+# Shared by the full transform and the per-section prompts so both send the
+# same instructions, only the short request at the end differs
+TONE_PROMPT_TEMPLATE = """
+Transform the document above according to these specifications:
+
+Style: {tone}
+Text Type: {text_type}
+Technical Vocabulary Level: {technical_level}
+Formality Level: {formality_level}
+Use of Numbers and Statistics: {statistics_level}
+
+Instructions:
+- Write in a {tone_lower} style appropriate for a {text_type_lower}
+- Use {technical_level_lower} level technical vocabulary
+- Maintain {formality_level_lower} formality
+- Include {statistics_level_lower} level of numerical data and statistics
+- Structure appropriately for a {text_type_lower}
+"""
+
+TONE_SECTION_REQUEST = """
+If the text is a code, make a text with this structure about the code.
+
+Generate the {section} section for this text type. If the section doesn't apply to this text type, respond with: "This section doesn't apply to a {text_type_lower}."
+
+Provide only the {section} portion.
+"""
+
+TONE_SECTIONS_REQUEST = """
+If the text is a code, make a text with this structure about the code.
+
+Generate each of these sections for this text type: {section_names}.
+
+Return only a JSON object with exactly these keys: {section_keys}.
+Each value must be a string containing only that section of the transformed text.
+
+If a section doesn't apply to this text type, set its value to: "This section doesn't apply to a {{text_type_lower}}."
+""".format(
+    section_names=", ".join(SECTION_PRETTY.values()),
+    section_keys=", ".join(f'"{section}"' for section in ANALYSIS_SECTIONS)
+)
+
+TONE_CORRECTIONS_PROMPT = """
+Analyze the document above for corrections.
+
+Provide analysis in this format:
+
+COHERENCE: [Analysis and suggestions]
+STYLE: [Analysis and suggestions]
+GRAMMAR: [Analysis and suggestions]
+OTHER CORRECTIONS: [Any other improvements needed]
+"""
+
+TRANSFORM_REQUEST = """
+Please provide the transformed text.
+"""
+
+EVALUATION_PROMPT = """
+Evaluate the document above comprehensively across multiple dimensions. Provide grades from 0 to 10 and specific corrections where needed.
+
+Please provide your evaluation in this exact format:
+
+SPELLING EVALUATION:
+Grade: [0-10]
+Corrections: [List spelling errors and corrections, or "No spelling errors found"]
+
+GRAMMAR EVALUATION:
+Grade: [0-10]
+Corrections: [List grammar errors and corrections, or "No grammar errors found"]
+
+STYLE EVALUATION:
+Grade: [0-10]
+Text Type Detected: [e.g., Academic paper, Report, Blog post, etc.]
+Style Analysis: [Analysis of writing style and suggestions for improvement]
+
+COHERENCE EVALUATION:
+Grade: [0-10]
+Corrections: [List coherence issues and suggestions, or "Text is coherent"]
+
+OVERALL EVALUATION:
+Grade: [0-10]
+Overall Corrections: [Summary of main issues and recommendations for improvement]
+"""
+
+HYPOTHESIS_DETAILS_PROMPT = """
+For this research hypothesis: {hypothesis}
+
+Provide the three parts below, each starting with its heading on its own line, exactly as written.
+
+===STATISTICS===
+Main statistics and data points related to the hypothesis:
+- Relevant numerical data
+- Key statistics
+- Important metrics
+- Sample sizes or populations when relevant
+- Any significant findings from existing research
+Present this information in a clear, organized manner.
+
+===REFERENCES===
+The most important academic references and sources that a researcher should check:
+- Key academic papers or studies
+- Important books on the topic
+- Relevant journals
+- Government or institutional reports
+- Online databases or resources
+Format as a list with brief descriptions of why each source is important.
+
+===OUTLINE===
+A detailed proposed outline for a research text based on the hypothesis, including:
+- Introduction section with subsections
+- Literature review structure
+- Methodology section
+- Results/Analysis section
+- Discussion section
+- Conclusion section
+- References section
+Format as a hierarchical outline with main sections and subsections.
+Make it detailed enough that a researcher can use it as a framework to write their paper.
+"""
+
+# Structured variant of the evaluation, answered through the tool below on
+# models that support tool use
+EVALUATION_TOOL_PROMPT = """
+Evaluate the document above comprehensively across spelling, grammar, style, coherence and overall quality. Give each a grade from 0 to 10 and specific corrections where needed.
+For style, also name the text type detected (e.g., Academic paper, Report, Blog post, etc.) and analyze the writing style.
+
+Record the evaluation with the record_evaluation tool.
+"""
+
+# Style is also asked for the detected text type and an analysis, as in the text format
+EVALUATION_STYLE_PROPERTIES = {
+    "text_type": {"type": "string", "description": "Text type detected, e.g. Academic paper, Report, Blog post"},
+    "style_analysis": {"type": "string", "description": "Analysis of the writing style and suggestions for improvement"}
+}
+
+EVALUATION_TOOL = {
+    "name": "record_evaluation",
+    "description": "Record the evaluation of the document, with a grade and corrections for each dimension.",
+    "inputSchema": {
+        "json": {
+            "type": "object",
+            "properties": {
+                key: {
+                    "type": "object",
+                    "description": title,
+                    "properties": {
+                        "grade": {"type": "integer", "minimum": 0, "maximum": 10},
+                        "corrections": {"type": "string", "description": "Specific errors and corrections, or a note that none were found"},
+                        **(EVALUATION_STYLE_PROPERTIES if key == "style" else {})
+                    },
+                    "required": ["grade", "corrections"] + (list(EVALUATION_STYLE_PROPERTIES) if key == "style" else [])
+                }
+                for key, title in EVALUATION_SECTIONS
+            },
+            "required": [key for key, _ in EVALUATION_SECTIONS]
+        }
+    }
+}
+
+# Formatting rules for each reference style. Together with the requirements
+# they form a fixed prefix per style, so the prompt bytes only differ in the
+# short field block. At about 300 tokens the prefix is below Bedrock's prompt
+# caching minimum, so no cache point is added for it
+STYLE_RULES = {
+    "APA": """APA 7th edition rules:
+- Authors: Last name, initials (e.g., Smith, J. A.), "&" before the last author, up to 20 authors
+- Date: (Year) after the authors, (Year, Month Day) for web pages and reports when available
+- Titles of articles, chapters and web pages in sentence case, not italicized
+- Titles of books, reports and theses in italics and sentence case, journal names in italics and title case
+- Journal articles: Journal Name, Volume(Issue), pages, with the volume in italics
+- Books: edition in parentheses after the title when not the first, then the publisher, no place of publication
+- Theses: [Doctoral dissertation or Master's thesis, Institution]
+- Reports: the organization as author when no person is given, report number in parentheses after the title
+- Websites: site name, then the URL, retrieval date only for content that changes over time
+- DOI as https://doi.org/... with no period after it""",
+    "MLA": """MLA 9th edition rules:
+- Authors: Last name, First name, two authors joined with "and", three or more as the first author followed by "et al."
+- Titles of articles, chapters and web pages in quotation marks and title case
+- Titles of containers (journals, books, websites) in italics and title case
+- Order: Author. Title. Container, Other contributors, Version, Number (vol., no.), Publisher, Publication date, Location (pp., URL or DOI).
+- Books: edition as "2nd ed." after the title
+- Theses: the institution as publisher, followed by "PhD dissertation" or "Master's thesis"
+- Websites: the access date as "Accessed Day Month Year." when provided
+- DOI as https://doi.org/...
+- End the entry with a period""",
+    "Chicago": """Chicago Manual of Style 17th edition bibliography rules:
+- Authors: Last name, First name for the first author, First Last for the others, "and" before the last author
+- Titles of articles and chapters in quotation marks with headline-style capitalization
+- Titles of books, journals, reports and websites in italics
+- Journal articles: Journal Name Volume, no. Issue (Year): pages.
+- Books: Place: Publisher, Year. Edition as "2nd ed." after the title
+- Theses: "Title." PhD diss. or Master's thesis, Institution, Year.
+- Reports: Organization. Title. Report Number. Place: Publisher, Year.
+- Websites: "Page Title." Website Name. Accessed Month Day, Year. URL.
+- DOI as https://doi.org/... at the end of the entry"""
+}
+
+REFERENCE_RULES_TEMPLATE = """
+You create properly formatted references in {style} style.
+
+{style_rules}
+
+Requirements:
+1. Follow {style} formatting guidelines exactly
+2. Include all provided information in the correct order
+3. Use proper punctuation, italics, and formatting
+4. Include DOI if provided
+5. Handle missing information appropriately
+6. Provide only the formatted reference
+
+Format the reference exactly as it should appear in a reference list.
+"""
+
+REFERENCE_PREFIXES = {
+    style: REFERENCE_RULES_TEMPLATE.format(style=style, style_rules=rules)
+    for style, rules in STYLE_RULES.items()
+}
+
+REFERENCE_REQUEST_TEMPLATE = """
+Create the reference for this {ref_type_lower}.
+
+Reference Information:
+{field_info}
+"""
+
+REFERENCE_BATCH_TEMPLATE = """
+Create the reference for each of the {count} works below. Each item holds
+the information the user has for one work, possibly incomplete or in a
+different citation style.
+
+Return only a JSON array of {count} strings, one formatted reference per
+item, in the same order as the items.
+
+Items:
+{items}
+"""
+
+LATEX_PROMPT_TEMPLATE = """
+Convert the document above into properly formatted LaTeX code suitable for RMarkdown that can be knitted into a PDF.
+
+Document Type: {document_type}
+
+Requirements:
+1. Create a complete LaTeX document structure appropriate for a {document_type_lower}
+2. Include proper document class and packages
+3. Format any equations, numbers, or special formatting appropriately
+4. Add proper sectioning (\\section, \\subsection, etc.)
+5. Include title, author, date fields that can be customized
+6. Use proper LaTeX formatting for lists, emphasis, etc.
+7. Add comments explaining key formatting choices
+8. Make it compatible with RMarkdown output: pdf_document
+
+Provide only the LaTeX code that can be copied and pasted into RMarkdown.
+"""
+
+def document_prefix(text):
+    """Document block for the user's text, identified by a hash of its content"""
+    # The id only changes when the text does, which invalidates the cached prefix
+    doc_id = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    return DOCUMENT_PREFIX_TEMPLATE.format(doc_id=doc_id, text=text)
+
+def build_tone_prompt(tone, text_type, technical_level, formality_level, statistics_level, section=None, all_sections=False):
+    """Tone instructions followed by a request for one section, all sections, or the whole transformed text"""
+    settings = {
+        "tone": tone,
+        "text_type": text_type,
+        "technical_level": technical_level,
+        "formality_level": formality_level,
+        "statistics_level": statistics_level
+    }
+    # The instructions use the lowercase forms of every setting
+    settings.update({f"{name}_lower": value.lower() for name, value in list(settings.items())})
+    
+    prompt = TONE_PROMPT_TEMPLATE.format(**settings)
+    if all_sections:
+        return prompt + TONE_SECTIONS_REQUEST.format(**settings)
+    if section:
+        return prompt + TONE_SECTION_REQUEST.format(section=SECTION_PRETTY[section], **settings)
+    return prompt + TRANSFORM_REQUEST
 
 # ==== TAB 1: USER OWN TEXT (ENHANCED) ====
+# Function to analyze text and generate components
+async def analyze_user_text_enhanced(text, model_id):
+    # Every prompt starts with the same text block so Bedrock can cache it
+    text_prefix = document_prefix(text)
+    
+    # The two calls are independent network requests, so await them
+    # concurrently over one shared client
+    async with async_bedrock_client() as client:
+        sections_response, corrections = await asyncio.gather(
+            call_bedrock_model_async(ANALYSIS_SECTIONS_PROMPT, model_id, prefix=text_prefix, max_tokens=4000, client=client),
+            call_bedrock_model_async(CORRECTIONS_PROMPT, model_id, prefix=text_prefix, client=client)
+        )
+    results = parse_json_sections(
+        sections_response,
+        ANALYSIS_SECTIONS,
+        lambda section: f"This text doesn't contain a {SECTION_PRETTY[section]}."
+    )
+    
+    # Parse corrections into separate sections
+    results["corrections"] = split_sections(corrections, CORRECTION_MARKERS, "No corrections needed.")
+    return results
+
 with tab1:
     st.header("Analyze Your Own Text")
     st.write("Input your text and get a comprehensive analysis with different components and corrections.")
@@ -261,101 +1130,6 @@ with tab1:
     # Input text area
     user_text = st.text_area("Enter your text for analysis:", height=200, key="user_text_input")
     
-    # Function to analyze text and generate components
-    def analyze_user_text_enhanced(text, model_id):
-        sections = [
-            "hypothesis", "main_bullet_points", "most_important_data_points", 
-            "summary", "abstract", "introduction", "body_text", "conclusion", "appendix"
-        ]
-        
-        results = {}
-        
-        for section in sections:
-            prompt = f"""
-            Analyze the following text and generate the {section.replace('_', ' ')} section.
-            
-            Text to analyze:
-            {text}
-            
-            If the text doesn't contain a clear {section.replace('_', ' ')}, respond with: "This text doesn't contain a {section.replace('_', ' ')}."
-            
-            Otherwise, please provide only the {section.replace('_', ' ')} for this text. Be concise and relevant.
-            """
-            
-            result = call_bedrock_model(prompt, model_id)
-            results[section] = result
-        
-        # Add coherence and style analysis
-        corrections_prompt = f"""
-        Analyze the following text for various corrections and improvements:
-        
-        Text to analyze:
-        {text}
-        
-        Please provide analysis in the following format:
-        
-        SPELLING CORRECTIONS:
-        [Evaluate spelling, identify errors, and provide suggestions]
-        
-        GRAMMAR CORRECTIONS:
-        [Evaluate grammar, identify errors, and provide suggestions]
-        
-        COHERENCE CORRECTIONS:
-        [Evaluate coherence, identify errors, and provide suggestions]
-        
-        STYLE CORRECTIONS:
-        [Evaluate style, identify errors, and provide suggestions]
-        
-        ORDER CORRECTIONS:
-        [Evaluate the order of ideas in the document, identify errors, and provide suggestions]
-        
-        PROPOSED CORRECTION:
-        [Provide a corrected version of the text that addresses all the above issues to make it clearer]
-        """
-        
-        corrections = call_bedrock_model(corrections_prompt, model_id)
-        
-        # Parse corrections into separate sections using a more robust approach
-        correction_sections = {}
-        sections_to_extract = [
-            ("SPELLING CORRECTIONS:", "spelling"),
-            ("GRAMMAR CORRECTIONS:", "grammar"),
-            ("COHERENCE CORRECTIONS:", "coherence"),
-            ("STYLE CORRECTIONS:", "style"),
-            ("ORDER CORRECTIONS:", "order"),
-            ("PROPOSED CORRECTION:", "proposed")
-        ]
-        
-        # Create a list of all found markers with their positions
-        found_markers = []
-        for marker, key in sections_to_extract:
-            pos = corrections.find(marker)
-            if pos != -1:
-                found_markers.append((pos, marker, key))
-        
-        # Sort by position to process them in order
-        found_markers.sort(key=lambda x: x[0])
-        
-        # Extract content between markers
-        for i, (pos, marker, key) in enumerate(found_markers):
-            start_idx = pos + len(marker)
-            
-            # Find the end position (next marker or end of text)
-            if i + 1 < len(found_markers):
-                end_idx = found_markers[i + 1][0]
-                correction_sections[key] = corrections[start_idx:end_idx].strip()
-            else:
-                # This is the last marker, take everything to the end
-                correction_sections[key] = corrections[start_idx:].strip()
-        
-        # Fill in any missing sections
-        for _, key in sections_to_extract:
-            if key not in correction_sections:
-                correction_sections[key] = "No corrections needed."
-        
-        results["corrections"] = correction_sections
-        return results
-    
     # Generate analysis button
     if st.button("Analyze Text", key="analyze_text"):
         if not user_text.strip():
@@ -364,7 +1138,7 @@ with tab1:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
             with st.spinner("Analyzing your text..."):
-                analysis_results = analyze_user_text_enhanced(user_text, MODEL_ID)
+                analysis_results = asyncio.run(analyze_user_text_enhanced(user_text, MODEL_ID))
                 st.session_state["analysis_results"] = analysis_results
     
     # Display results if available
@@ -374,19 +1148,7 @@ with tab1:
         # Create columns for better layout
         col1, col2 = st.columns(2)
         
-        sections = [
-            ("hypothesis", "Hypothesis"),
-            ("main_bullet_points", "Main Bullet Points"),
-            ("most_important_data_points", "Most Important Data Points"),
-            ("summary", "Summary"),
-            ("abstract", "Abstract"),
-            ("introduction", "Introduction"),
-            ("body_text", "Body Text"),
-            ("conclusion", "Conclusion"),
-            ("appendix", "Appendix")
-        ]
-        
-        for i, (key, title) in enumerate(sections):
+        for i, (key, title) in enumerate(SECTION_TITLES.items()):
             with col1 if i % 2 == 0 else col2:
                 st.text_area(
                     title,
@@ -399,19 +1161,10 @@ with tab1:
         if "corrections" in st.session_state["analysis_results"]:
             st.subheader("Text Corrections and Improvements")
             
-            correction_types = [
-                ("spelling", "Spelling Corrections"),
-                ("grammar", "Grammar Corrections"),
-                ("coherence", "Coherence Corrections"),
-                ("style", "Style Corrections"),
-                ("order", "Order Corrections"),
-                ("proposed", "Proposed Corrected Text")
-            ]
-            
             # Create two columns for corrections
             col1, col2 = st.columns(2)
             
-            for i, (key, title) in enumerate(correction_types):
+            for i, (key, title) in enumerate(CORRECTION_TYPES):
                 with col1 if i % 2 == 0 else col2:
                     st.text_area(
                         title,
@@ -420,611 +1173,111 @@ with tab1:
                         key=f"correction_{key}"
                     )
 
-
 # ==== TAB 2: CHANGE TEXT TONE (ENHANCED) ====
-with tab2:
-    st.header("Change Text Tone")
-    st.write("Transform your text into different tones and styles with advanced customization options.")
-    
-    # Create columns for controls
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Tone selection
-        tone_options = ["Academic", "Technical", "Simple", "Descriptive", "Narrative"]
-        selected_tone = st.selectbox("Select the tone you want:", tone_options)
-        
-        # Text type selection
-        text_type_options = ["Report", "Summary", "Academic Paper", "Press Release"]
-        selected_text_type = st.selectbox("Select the type of text:", text_type_options)
-    
-    with col2:
-        # Technical level
-        technical_level = st.selectbox(
-            "Technical vocabulary level:",
-            ["Very Low", "Low", "Moderate", "High", "Very High"]
-        )
-        
-        # Formality level
-        formality_level = st.selectbox(
-            "Formality level:",
-            ["Very Low", "Low", "Moderate", "High", "Very High"]
-        )
-        
-        # Use of numbers and statistics
-        statistics_level = st.selectbox(
-            "Use of numbers and statistics:",
-            ["Very Low", "Low", "Moderate", "High", "Very High"]
-        )
-    
-    # Input text area
-    tone_text = st.text_area("Enter your text to change tone:", height=200, key="tone_text_input")
-    
-    # Function to change text tone for specific section with enhanced options
-    def change_text_tone_section_enhanced(text, tone, section, text_type, technical_level, formality_level, statistics_level, model_id):
-        prompt = f"""
-        Transform the following text according to these specifications, if the text is a code, make a text with the following structure about the code:
-        
-        Style: {tone}
-        Text Type: {text_type}
-        Technical Vocabulary Level: {technical_level}
-        Formality Level: {formality_level}
-        Use of Numbers and Statistics: {statistics_level}
-        
-        Generate the {section.replace('_', ' ')} section for this text type.
-        
-        Original text:
-        {text}
-        
-        Instructions:
-        - Write in a {tone.lower()} style appropriate for a {text_type.lower()}
-        - Use {technical_level.lower()} level technical vocabulary
-        - Maintain {formality_level.lower()} formality
-        - Include {statistics_level.lower()} level of numerical data and statistics
-        - Structure appropriately for a {text_type.lower()}
-        - If the section doesn't apply to this text type, respond with: "This section doesn't apply to a {text_type.lower()}."
-        
-        Provide only the {section.replace('_', ' ')} portion.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to transform the text
-    def transform_text(text, tone, text_type, technical_level, formality_level, statistics_level, model_id):
-        prompt = f"""
-        Transform the following text according to these specifications:
-        
-        Style: {tone}
-        Text Type: {text_type}
-        Technical Vocabulary Level: {technical_level}
-        Formality Level: {formality_level}
-        Use of Numbers and Statistics: {statistics_level}
-        
-        Original text:
-        {text}
-        
-        Instructions:
-        - Write in a {tone.lower()} style appropriate for a {text_type.lower()}
-        - Use {technical_level.lower()} level technical vocabulary
-        - Maintain {formality_level.lower()} formality
-        - Include {statistics_level.lower()} level of numerical data and statistics
-        - Structure appropriately for a {text_type.lower()}
-        
-        Please provide the transformed text.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Transform text button
-    if st.button("Transform Text", key="transform_text_button"):
-        if not tone_text.strip():
-            st.error("Please enter some text to transform.")
-        elif not MODEL_ID:
-            st.error("⚠️ Please select a model in the sidebar first")
-        else:
-            with st.spinner("Transforming your text..."):
-                transformed_text = transform_text(
-                    tone_text, 
-                    selected_tone, 
-                    selected_text_type, 
-                    technical_level, 
-                    formality_level, 
-                    statistics_level, 
-                    MODEL_ID
-                )
-                st.session_state["transformed_text"] = transformed_text
-    
-    # Display transformed text if available
-    if "transformed_text" in st.session_state:
-        st.subheader("Transformed Text")
-        st.text_area(
-            "Result",
-            value=st.session_state["transformed_text"],
-            height=300,
-            key="transform_result"
-        )
+# Choices for the tone controls
+TONE_OPTIONS = ("Academic", "Technical", "Simple", "Descriptive", "Narrative")
+TEXT_TYPE_OPTIONS = ("Report", "Summary", "Academic Paper", "Press Release")
+LEVEL_OPTIONS = ("Very Low", "Low", "Moderate", "High", "Very High")
 
-# ==== TAB 4: TEXT EVALUATION ====
-with tab4:
-    st.header("Text Evaluation")
-    st.write("Evaluate your text for style, grammar, and other aspects.")
-    
-    # Input text area - using a unique key to avoid conflicts
-    evaluation_text = st.text_area("Enter your text to evaluate:", height=200, key="text_evaluation_input")
-    
-    # Function to evaluate text
-    def evaluate_text_comprehensive(text, model_id):
-        prompt = f"""
-        Provide a comprehensive evaluation of the following text:
-        
-        Text to evaluate:
-        {text}
-        
-        Please structure your evaluation in the following format (and give the corresponding scores out of 10, followed by proposed corrections to address the issues):
-        
-        SPELLING EVALUATION:
-        [Evaluate spelling, identify errors, and provide suggestions]
-        
-        GRAMMAR EVALUATION:
-        [Evaluate grammar, identify errors, and provide suggestions]
-        
-        STYLE EVALUATION:
-        [Evaluate writing style, flow, and clarity]
-        
-        COHERENCE EVALUATION:
-        [Evaluate logical flow and connection between ideas]
-        
-        OVERALL EVALUATION:
-        [Provide an overall assessment of the text quality]
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to parse evaluation results
-    def parse_evaluation_results(evaluation_text):
-        sections = {}
-        
-        # Define the sections to extract
-        section_markers = [
-            ("SPELLING EVALUATION:", "spelling"),
-            ("GRAMMAR EVALUATION:", "grammar"),
-            ("STYLE EVALUATION:", "style"),
-            ("COHERENCE EVALUATION:", "coherence"),
-            ("OVERALL EVALUATION:", "overall")
-        ]
-        
-        for marker, key in section_markers:
-            if marker in evaluation_text:
-                start_idx = evaluation_text.find(marker) + len(marker)
-                # Find the next section or end of text
-                next_markers = [m for m, _ in section_markers if m != marker and m in evaluation_text]
-                if next_markers:
-                    next_indices = [evaluation_text.find(m) for m in next_markers if evaluation_text.find(m) > start_idx]
-                    if next_indices:
-                        next_idx = min(next_indices)
-                        sections[key] = evaluation_text[start_idx:next_idx].strip()
-                    else:
-                        sections[key] = evaluation_text[start_idx:].strip()
-                else:
-                    sections[key] = evaluation_text[start_idx:].strip()
-            else:
-                sections[key] = "No evaluation available for this section."
-        
-        return sections
-    
-    # Evaluate text button - using a unique key to avoid conflict
-    if st.button("Evaluate Text", key="evaluate_text_button"):
-        if not evaluation_text.strip():
-            st.error("Please enter some text to evaluate.")
-        elif not MODEL_ID:
-            st.error("⚠️ Please select a model in the sidebar first")
-        else:
-            with st.spinner("Evaluating your text..."):
-                evaluation_results = evaluate_text_comprehensive(evaluation_text, MODEL_ID)
-                parsed_results = parse_evaluation_results(evaluation_results)
-                st.session_state["evaluation_results"] = parsed_results
-                st.session_state["raw_evaluation"] = evaluation_results
+# Function to change text tone for specific section with enhanced options
+def change_text_tone_section_enhanced(text, tone, section, text_type, technical_level, formality_level, statistics_level, model_id, use_cache=True):
+    prompt = build_tone_prompt(tone, text_type, technical_level, formality_level, statistics_level, section)
     
-    # Display evaluation results
-    if "evaluation_results" in st.session_state:
-        st.subheader("Text Evaluation Results")
-        
-        # Create columns for better layout
-        col1, col2 = st.columns(2)
-        
-        evaluation_sections = [
-            ("spelling", "Spelling Evaluation"),
-            ("grammar", "Grammar Evaluation"),
-            ("style", "Style Evaluation"),
-            ("coherence", "Coherence Evaluation"),
-            ("overall", "Overall Evaluation")
-        ]
-        
-        for i, (key, title) in enumerate(evaluation_sections):
-            with col1 if i % 2 == 0 else col2:
-                if key in st.session_state["evaluation_results"]:
-                    st.text_area(
-                        title,
-                        value=st.session_state["evaluation_results"][key],
-                        height=200,
-                        key=f"eval_{key}"
-                    )
-                else:
-                    st.text_area(
-                        title,
-                        value="No evaluation available for this section.",
-                        height=200,
-                        key=f"eval_{key}_empty"
-                    )
+    return call_bedrock_model(prompt, model_id, prefix=document_prefix(text), use_cache=use_cache)
 
-# ==== TAB 5: LATEX MAKER ====
-with tab5:
-    st.header("LaTeX Maker")
-    st.write("Convert your text into properly formatted LaTeX code for RMarkdown that can be knitted into a PDF.")
-    
-    # Text type selection for LaTeX
-    latex_text_type = st.selectbox(
-        "Select the type of document:",
-        ["Academic Paper", "Report", "Press Release", "Technical Manual", "Thesis", "Article"],
-        key="latex_text_type"
-    )
-    
-    # Input text area
-    latex_text = st.text_area("Enter your text to convert to LaTeX:", height=200, key="latex_text_input")
-    
-    # Function to generate LaTeX code
-    def generate_latex_code(text, document_type, model_id):
-        prompt = f"""
-        Convert the following text into properly formatted LaTeX code suitable for RMarkdown that can be knitted into a PDF.
-        
-        Document Type: {document_type}
-        
-        Text to convert:
-        {text}
-        
-        Requirements:
-        1. Create a complete LaTeX document structure appropriate for a {document_type.lower()}
-        2. Include proper document class and packages
-        3. Format any equations, numbers, or special formatting appropriately
-        4. Add proper sectioning (\\section, \\subsection, etc.)
-        5. Include title, author, date fields that can be customized
-        6. Use proper LaTeX formatting for lists, emphasis, etc.
-        7. Add comments explaining key formatting choices
-        8. Make it compatible with RMarkdown output: pdf_document
-        
-        Provide only the LaTeX code that can be copied and pasted into RMarkdown.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Generate LaTeX button
-    if st.button("Generate LaTeX Code", key="generate_latex"):
-        if not latex_text.strip():
-            st.error("Please enter some text to convert.")
-        elif not MODEL_ID:
-            st.error("⚠️ Please select a model in the sidebar first")
-        else:
-            with st.spinner("Generating LaTeX code..."):
-                latex_code = generate_latex_code(latex_text, latex_text_type, MODEL_ID)
-                st.session_state["latex_code"] = latex_code
-    
-    # Display LaTeX code
-    if "latex_code" in st.session_state:
-        st.subheader("Generated LaTeX Code")
-        st.text_area(
-            "Copy this code into your RMarkdown document:",
-            value=st.session_state["latex_code"],
-            height=500,
-            key="latex_output"
+# Function to change text tone for every section in a single request, with
+# the corrections for the text requested alongside it
+async def change_text_tone_sections(text, tone, text_type, technical_level, formality_level, statistics_level, model_id):
+    prompt = build_tone_prompt(tone, text_type, technical_level, formality_level, statistics_level, all_sections=True)
+    text_prefix = document_prefix(text)
+    
+    async with async_bedrock_client() as client:
+        sections_response, corrections = await asyncio.gather(
+            call_bedrock_model_async(prompt, model_id, prefix=text_prefix, max_tokens=4000, client=client),
+            call_bedrock_model_async(TONE_CORRECTIONS_PROMPT, model_id, prefix=text_prefix, client=client)
         )
-        
-        # Instructions for using the code
-        st.info("""
-        **How to use this LaTeX code:**
-        1. Copy the generated code above
-        2. Create a new RMarkdown file (.Rmd)
-        3. Set the output to `pdf_document` in the YAML header
-        4. Paste the LaTeX code in the document body
-        5. Knit to PDF
-        
-        **Sample YAML header:**
-        ```yaml
-        ---
-        title: "Your Title"
-        author: "Your Name"
-        date: "`r Sys.Date()`"
-        output: pdf_document
-        ---
-        ```
-        """)
-
-# ==== TAB 6: REFERENCE MAKER ====
-with tab6:
-    st.header("Reference Maker")
-    st.write("Create properly formatted references in APA, MLA, or Chicago style.")
-    
-    # Reference style selection
-    reference_style = st.selectbox(
-        "Select reference style:",
-        ["APA", "MLA", "Chicago"],
-        key="reference_style"
+    results = parse_json_sections(
+        sections_response,
+        ANALYSIS_SECTIONS,
+        lambda section: f"This section doesn't apply to a {text_type.lower()}."
     )
+    results["corrections"] = corrections
+    return results
+
+# Function to transform the text
+def transform_text(text, tone, text_type, technical_level, formality_level, statistics_level, model_id, placeholder):
+    prompt = build_tone_prompt(tone, text_type, technical_level, formality_level, statistics_level)
     
-    # Reference type selection
-    reference_type = st.selectbox(
-        "Select reference type:",
-        ["Journal Article", "Book", "Website", "Conference Paper", "Thesis/Dissertation", "Report"],
-        key="reference_type"
-    )
+    return call_bedrock_model_stream(prompt, model_id, placeholder, prefix=document_prefix(text))
+
+with tab2:
+    st.header("Change Text Tone")
+    st.write("Transform your text into different tones and styles with advanced customization options.")
     
-    # Create input fields based on reference type
+    # Create columns for controls
     col1, col2 = st.columns(2)
     
     with col1:
-        author = st.text_input("Author(s):", key="ref_author")
-        title = st.text_input("Title:", key="ref_title")
-        year = st.text_input("Year Published:", key="ref_year")
-        
-        if reference_type in ["Journal Article", "Conference Paper"]:
-            journal_conference = st.text_input("Journal/Conference Name:", key="ref_journal")
-            volume = st.text_input("Volume:", key="ref_volume")
-            issue = st.text_input("Issue:", key="ref_issue")
-            pages = st.text_input("Pages:", key="ref_pages")
-        
-        if reference_type == "Book":
-            publisher = st.text_input("Publisher:", key="ref_publisher")
-            place_published = st.text_input("Place Published:", key="ref_place")
-            edition = st.text_input("Edition (if not first):", key="ref_edition")
+        # Tone selection
+        selected_tone = st.selectbox("Select the tone you want:", TONE_OPTIONS)
         
-        if reference_type == "Website":
-            website_name = st.text_input("Website Name:", key="ref_website")
-            url = st.text_input("URL:", key="ref_url")
-            access_date = st.text_input("Date Accessed:", key="ref_access_date")
+        # Text type selection
+        selected_text_type = st.selectbox("Select the type of text:", TEXT_TYPE_OPTIONS)
     
     with col2:
-        if reference_type == "Thesis/Dissertation":
-            institution = st.text_input("Institution:", key="ref_institution")
-            degree_type = st.text_input("Degree Type (Master's/PhD):", key="ref_degree")
-            department = st.text_input("Department:", key="ref_department")
-        
-        if reference_type == "Report":
-            organization = st.text_input("Organization:", key="ref_organization")
-            report_number = st.text_input("Report Number:", key="ref_report_num")
-            place_published = st.text_input("Place Published:", key="ref_report_place")
-        
-        # Additional fields for all types
-        doi = st.text_input("DOI (if available):", key="ref_doi")
-        notes = st.text_area("Additional Notes:", key="ref_notes", height=100)
-    
-    # Function to generate reference
-    def generate_reference(style, ref_type, fields, model_id):
-        # Create a string with all the provided information
-        field_info = "\n".join([f"{key}: {value}" for key, value in fields.items() if value.strip()])
-        
-        prompt = f"""
-        Create a properly formatted reference in {style} style for a {ref_type.lower()}.
-        
-        Reference Information:
-        {field_info}
-        
-        Requirements:
-        1. Follow {style} formatting guidelines exactly
-        2. Include all provided information in the correct order
-        3. Use proper punctuation, italics, and formatting
-        4. Include DOI if provided
-        5. Handle missing information appropriately
-        6. Provide only the formatted reference
+        # Technical level
+        technical_level = st.selectbox(
+            "Technical vocabulary level:",
+            LEVEL_OPTIONS
+        )
         
-        Format the reference exactly as it should appear in a reference list.
-        """
+        # Formality level
+        formality_level = st.selectbox(
+            "Formality level:",
+            LEVEL_OPTIONS
+        )
         
-        return call_bedrock_model(prompt, model_id)
+        # Use of numbers and statistics
+        statistics_level = st.selectbox(
+            "Use of numbers and statistics:",
+            LEVEL_OPTIONS
+        )
+    
+    # Input text area
+    tone_text = st.text_area("Enter your text to change tone:", height=200, key="tone_text_input")
     
-    # Generate reference button
-    if st.button("Generate Reference", key="generate_reference"):
-        if not author.strip() or not title.strip():
-            st.error("Please provide at least author and title information.")
+    # Transform text button
+    if st.button("Transform Text", key="transform_text_button"):
+        if not tone_text.strip():
+            st.error("Please enter some text to transform.")
         elif not MODEL_ID:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
-            # Collect all field information
-            fields = {
-                "Author(s)": author,
-                "Title": title,
-                "Year": year,
-                "DOI": doi,
-                "Notes": notes
-            }
-            
-            # Add type-specific fields
-            if reference_type in ["Journal Article", "Conference Paper"]:
-                fields["Journal/Conference"] = locals().get("journal_conference", "")
-                fields["Volume"] = locals().get("volume", "")
-                fields["Issue"] = locals().get("issue", "")
-                fields["Pages"] = locals().get("pages", "")
-            elif reference_type == "Book":
-                fields["Publisher"] = locals().get("publisher", "")
-                fields["Place Published"] = locals().get("place_published", "")
-                fields["Edition"] = locals().get("edition", "")
-            elif reference_type == "Website":
-                fields["Website Name"] = locals().get("website_name", "")
-                fields["URL"] = locals().get("url", "")
-                fields["Date Accessed"] = locals().get("access_date", "")
-            elif reference_type == "Thesis/Dissertation":
-                fields["Institution"] = locals().get("institution", "")
-                fields["Degree Type"] = locals().get("degree_type", "")
-                fields["Department"] = locals().get("department", "")
-            elif reference_type == "Report":
-                fields["Organization"] = locals().get("organization", "")
-                fields["Report Number"] = locals().get("report_number", "")
-                fields["Place Published"] = locals().get("place_published", "")
-            
-            with st.spinner("Generating reference..."):
-                formatted_reference = generate_reference(reference_style, reference_type, fields, MODEL_ID)
-                st.session_state["formatted_reference"] = formatted_reference
+            with st.spinner("Transforming your text..."):
+                # Show the text while it streams, the result box below replaces it
+                stream_placeholder = st.empty()
+                transformed_text = transform_text(
+                    tone_text, 
+                    selected_tone, 
+                    selected_text_type, 
+                    technical_level, 
+                    formality_level, 
+                    statistics_level, 
+                    MODEL_ID,
+                    stream_placeholder
+                )
+                stream_placeholder.empty()
+                st.session_state["transformed_text"] = transformed_text
     
-    # Display generated reference
-    if "formatted_reference" in st.session_state:
-        st.subheader("Generated Reference")
+    # Display transformed text if available
+    if "transformed_text" in st.session_state:
+        st.subheader("Transformed Text")
         st.text_area(
-            f"Copy this {reference_style} style reference:",
-            value=st.session_state["formatted_reference"],
-            height=150,
-            key="reference_output"
+            "Result",
+            value=st.session_state["transformed_text"],
+            height=300,
+            key="transform_result"
         )
-        
-        st.success("✅ Reference generated successfully! You can copy and paste it into your document.")
-
-# ==== TAB 7: SETUP HELP ====
-with tab7:
-    st.header("AWS Bedrock Setup Guide")
-    
-    st.markdown("""
-    ## Troubleshooting AWS Bedrock Access
-    
-    If you're getting "AccessDeniedException" errors, follow these steps:
-    
-    ### 1. Verify AWS Region
-    
-    Bedrock is only available in specific regions:
-    - US East (N. Virginia): `us-east-1`
-    - US West (Oregon): `us-west-2`
-    - Europe (Frankfurt): `eu-central-1`
-    - Asia Pacific (Tokyo): `ap-northeast-1`
-    
-    Make sure you select one of these regions in the sidebar.
-    
-    ### 2. Enable Bedrock Model Access
-    
-    You need to request access to the specific models you want to use:
-    
-    1. Go to the [AWS Bedrock console](https://console.aws.amazon.com/bedrock/)
-    2. Click on "Model access" in the left sidebar
-    3. Click "Manage model access"
-    4. Select the models you want to use (Claude, Titan, etc.)
-    5. Click "Request model access"
-    6. Wait for approval (some models are approved instantly)
-    
-    ### 3. Check IAM Permissions
-    
-    Ensure your IAM user/role has these permissions:
-    
-    ```json
-    {
-        "Version": "2012-10-17",
-        "Statement": [
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "bedrock:ListFoundationModels",
-                    "bedrock:GetFoundationModel"
-                ],
-                "Resource": "*"
-            },
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "bedrock-runtime:InvokeModel"
-                ],
-                "Resource": "*"
-            },
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "s3:ListBucket",
-                    "s3:GetObject",
-                    "s3:PutObject",
-                    "s3:CreateBucket",
-                    "s3:ListAllMyBuckets"
-                ],
-                "Resource": [
-                    "arn:aws:s3:::*",
-                    "arn:aws:s3:::*/*"
-                ]
-            }
-        ]
-    }
-    ```
-    
-    ### 4. Configure AWS CLI
-    
-    Make sure your AWS CLI is properly configured:
-    
-    ```bash
-    aws configure --profile recruitment-assistant
-    ```
-    
-    Enter your AWS Access Key ID, Secret Access Key, region (e.g., us-east-1), and output format (json).
-    
-    ### 5. Test Your Access
-    
-    Use these commands to test if you can list Bedrock models:
-    
-    ```bash
-    aws bedrock list-foundation-models --region us-east-1 --profile recruitment-assistant
-    ```
-    
-    Test S3:
-    
-    ```bash
-    aws s3 ls --profile recruitment-assistant
-    ```
-    
-    If these work, you should be able to access these services through this app.
-    
-    ### 6. Application Features
-    
-    This enhanced version includes:
-    
-    **Tab 1 - User Own Text:**
-    - Comprehensive text analysis with sections detection
-    - Detailed corrections for spelling, grammar, coherence, style, and order
-    - Proposed corrected version of your text
-    
-    **Tab 2 - Change Text Tone:**
-    - Advanced tone transformation with customizable parameters
-    - Technical level, formality, and statistics usage controls
-    - Text type selection (report, academic paper, etc.)
-    - Coherence and style analysis of transformed text
-    
-    **Tab 3 - Topic Idea Explorer:**
-    - Hypothesis generation for any topic
-    - Statistical data and key references
-    - Detailed research outline for your chosen hypothesis
-    
-    **Tab 4 - Text Evaluation:**
-    - Comprehensive grading (0-10) for spelling, grammar, style, coherence
-    - Text type detection and analysis
-    - Specific corrections and recommendations
-    
-    **Tab 5 - LaTeX Maker:**
-    - Converts text to LaTeX code for RMarkdown
-    - Multiple document types supported
-    - Ready-to-use code with proper formatting
-    
-    **Tab 6 - Reference Maker:**
-    - Creates properly formatted references
-    - Supports APA, MLA, and Chicago styles
-    - Multiple reference types (articles, books, websites, etc.)
-    """)
-    
-    # Function to get corrections for transformed text
-    def get_tone_corrections(text, model_id):
-        corrections_prompt = f"""
-        Analyze the following text for corrections:
-        
-        Text:
-        {text}
-        
-        Provide analysis in this format:
-        
-        COHERENCE: [Analysis and suggestions]
-        STYLE: [Analysis and suggestions]
-        GRAMMAR: [Analysis and suggestions]
-        OTHER CORRECTIONS: [Any other improvements needed]
-        """
-        
-        return call_bedrock_model(corrections_prompt, model_id)
     
     # Generate tone change button
     if st.button("Transform Text Tone", key="change_tone"):
@@ -1034,21 +1287,12 @@ with tab7:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
             with st.spinner(f"Transforming text to {selected_tone.lower()} tone..."):
-                tone_results = {}
-                sections = [
-                    "hypothesis", "main_bullet_points", "most_important_data_points", 
-                    "summary", "abstract", "introduction", "body_text", "conclusion", "appendix"
-                ]
-                
-                for section in sections:
-                    tone_results[section] = change_text_tone_section_enhanced(
-                        tone_text, selected_tone, section, selected_text_type,
-                        technical_level, formality_level, statistics_level, MODEL_ID
-                    )
-                
-                # Get corrections for the transformed text
-                corrections = get_tone_corrections(tone_text, MODEL_ID)
-                tone_results["corrections"] = corrections
+                # All sections come back from one request, the regenerate
+                # buttons below still request a single section
+                tone_results = asyncio.run(change_text_tone_sections(
+                    tone_text, selected_tone, selected_text_type,
+                    technical_level, formality_level, statistics_level, MODEL_ID
+                ))
                 
                 st.session_state["tone_results"] = tone_results
                 st.session_state["current_tone"] = selected_tone
@@ -1062,50 +1306,45 @@ with tab7:
     
     # Display results with regenerate buttons
     if "tone_results" in st.session_state:
-        st.subheader(f"Text Transformed - Settings Applied")
-        st.write(f"**Style:** {st.session_state['current_settings']['tone']} | "
-                f"**Type:** {st.session_state['current_settings']['text_type']} | "
-                f"**Technical:** {st.session_state['current_settings']['technical_level']} | "
-                f"**Formality:** {st.session_state['current_settings']['formality_level']} | "
-                f"**Statistics:** {st.session_state['current_settings']['statistics_level']}")
-        
-        sections = [
-            ("hypothesis", "Hypothesis"),
-            ("main_bullet_points", "Main Bullet Points"),
-            ("most_important_data_points", "Most Important Data Points"),
-            ("summary", "Summary"),
-            ("abstract", "Abstract"),
-            ("introduction", "Introduction"),
-            ("body_text", "Body Text"),
-            ("conclusion", "Conclusion"),
-            ("appendix", "Appendix")
-        ]
+        # Stored together with the results, so it is always present here
+        applied_settings = st.session_state["current_settings"]
         
-        for key, title in sections:
-            col1, col2 = st.columns([4, 1])
+        st.subheader(f"Text Transformed - Settings Applied")
+        st.write(f"**Style:** {applied_settings['tone']} | "
+                f"**Type:** {applied_settings['text_type']} | "
+                f"**Technical:** {applied_settings['technical_level']} | "
+                f"**Formality:** {applied_settings['formality_level']} | "
+                f"**Statistics:** {applied_settings['statistics_level']}")
+        
+        for key, title in SECTION_TITLES.items():
+            value = st.session_state["tone_results"].get(key, "")
             
-            with col1:
-                st.text_area(
-                    title,
-                    value=st.session_state["tone_results"].get(key, ""),
-                    height=150,
-                    key=f"tone_result_{key}"
-                )
+            # Empty or not applicable sections collapse into an expander that
+            # only holds their regenerate button
+            if not value.strip() or value.startswith("This section doesn't apply"):
+                button_area = st.expander(f"{title} - {value.strip() or 'empty'}")
+            else:
+                text_column, button_area = st.columns([4, 1])
+                with text_column:
+                    st.text_area(
+                        title,
+                        value=value,
+                        height=150,
+                        key=f"tone_result_{key}"
+                    )
             
-            with col2:
+            with button_area:
                 if st.button(f"Regenerate", key=f"regen_{key}"):
                     if MODEL_ID and tone_text.strip():
                         with st.spinner(f"Regenerating {title.lower()}..."):
-                            settings = st.session_state.get('current_settings', {})
+                            # Regenerate with the settings the other sections used,
+                            # always asking the model for a new version
                             new_result = change_text_tone_section_enhanced(
                                 tone_text,
-                                settings.get('tone', selected_tone),
-                                key,
-                                settings.get('text_type', selected_text_type),
-                                settings.get('technical_level', technical_level),
-                                settings.get('formality_level', formality_level),
-                                settings.get('statistics_level', statistics_level),
-                                MODEL_ID
+                                section=key,
+                                model_id=MODEL_ID,
+                                use_cache=False,
+                                **applied_settings
                             )
                             st.session_state["tone_results"][key] = new_result
                             st.rerun()
@@ -1121,6 +1360,39 @@ with tab7:
             )
 
 # ==== TAB 3: TOPIC IDEA EXPLORER (ENHANCED) ====
+# Function to generate hypothesis options
+def generate_hypothesis_options(topic, model_id, placeholder):
+    prompt = f"""
+    Generate 10 different research hypothesis options for the topic: {topic}
+    
+    Each hypothesis should be:
+    - Specific and testable
+    - Relevant to the topic
+    - Academically sound
+    - Numbered from 1 to 10
+    
+    Format as:
+    1. [First hypothesis]
+    2. [Second hypothesis]
+    ...
+    10. [Tenth hypothesis]
+    """
+    
+    return call_bedrock_model_stream(prompt, model_id, placeholder)
+
+# Function to get statistics, references and outline for the selected hypothesis
+def get_hypothesis_details(hypothesis, model_id):
+    # One request returns all three parts between delimiters
+    response = call_bedrock_model(HYPOTHESIS_DETAILS_PROMPT.format(hypothesis=hypothesis), model_id, max_tokens=4000)
+    details = split_sections(response, HYPOTHESIS_MARKERS)
+    if not details:
+        # No delimiters (e.g. an error message), show the raw response in every box
+        return {key: response for key in HYPOTHESIS_MARKERS.values()}
+    
+    for key in HYPOTHESIS_MARKERS.values():
+        details.setdefault(key, f"No {key} returned for this hypothesis.")
+    return details
+
 with tab3:
     st.header("Topic Idea Explorer")
     st.write("Explore hypothesis ideas for any topic and get relevant statistics, references, and proposed outlines.")
@@ -1128,81 +1400,6 @@ with tab3:
     # Topic input
     topic_input = st.text_input("Enter a topic you want to explore:", key="topic_input")
     
-    # Function to generate hypothesis options
-    def generate_hypothesis_options(topic, model_id):
-        prompt = f"""
-        Generate 10 different research hypothesis options for the topic: {topic}
-        
-        Each hypothesis should be:
-        - Specific and testable
-        - Relevant to the topic
-        - Academically sound
-        - Numbered from 1 to 10
-        
-        Format as:
-        1. [First hypothesis]
-        2. [Second hypothesis]
-        ...
-        10. [Tenth hypothesis]
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to get statistics for selected hypothesis
-    def get_hypothesis_statistics(hypothesis, model_id):
-        prompt = f"""
-        Provide main statistics and data points related to this hypothesis: {hypothesis}
-        
-        Include:
-        - Relevant numerical data
-        - Key statistics
-        - Important metrics
-        - Sample sizes or populations when relevant
-        - Any significant findings from existing research
-        
-        Present this information in a clear, organized manner.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to get references for selected hypothesis
-    def get_hypothesis_references(hypothesis, model_id):
-        prompt = f"""
-        Provide the most important academic references and sources that a researcher should check 
-        for this hypothesis: {hypothesis}
-        
-        Include:
-        - Key academic papers or studies
-        - Important books on the topic
-        - Relevant journals
-        - Government or institutional reports
-        - Online databases or resources
-        
-        Format as a list with brief descriptions of why each source is important.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to get proposed outline
-    def get_hypothesis_outline(hypothesis, model_id):
-        prompt = f"""
-        Create a detailed proposed outline for a research text based on this hypothesis: {hypothesis}
-        
-        The outline should include:
-        - Introduction section with subsections
-        - Literature review structure
-        - Methodology section
-        - Results/Analysis section
-        - Discussion section
-        - Conclusion section
-        - References section
-        
-        Format as a hierarchical outline with main sections and subsections.
-        Make it detailed enough that a researcher can use it as a framework to write their paper.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
     # Generate hypotheses button
     if st.button("Generate Hypothesis Options", key="generate_hypotheses"):
         if not topic_input.strip():
@@ -1211,14 +1408,18 @@ with tab3:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
             with st.spinner("Generating hypothesis options..."):
-                hypotheses = generate_hypothesis_options(topic_input, MODEL_ID)
+                # Show the options while they stream, the list below replaces them
+                stream_placeholder = st.empty()
+                hypotheses = generate_hypothesis_options(topic_input, MODEL_ID, stream_placeholder)
+                stream_placeholder.empty()
                 st.session_state["hypotheses"] = hypotheses
                 st.session_state["selected_hypothesis"] = None
     
     # Display hypotheses if available
     if "hypotheses" in st.session_state:
         st.subheader("Generated Hypothesis Options")
-        st.text_area("Choose from these hypotheses:", value=st.session_state["hypotheses"], height=300, key="hypotheses_display")
+        st.caption("Choose from these hypotheses:")
+        st.code(st.session_state["hypotheses"], language=None, wrap_lines=True)
         
         # Input for selected hypothesis
         selected_hypothesis = st.text_area(
@@ -1229,20 +1430,21 @@ with tab3:
         
         # Button to get statistics, references, and outline
         if st.button("Get Statistics, References & Outline", key="get_stats_refs_outline"):
+            # Whitespace-only edits to the hypothesis keep the results already shown
+            details_request = (" ".join(selected_hypothesis.split()), MODEL_ID)
             if not selected_hypothesis.strip():
                 st.error("Please select a hypothesis first.")
-            else:
+            elif st.session_state.get("hypothesis_details_request") != details_request:
                 with st.spinner("Getting statistics, references, and outline..."):
-                    # Get statistics
-                    statistics = get_hypothesis_statistics(selected_hypothesis, MODEL_ID)
-                    # Get references
-                    references = get_hypothesis_references(selected_hypothesis, MODEL_ID)
-                    # Get outline
-                    outline = get_hypothesis_outline(selected_hypothesis, MODEL_ID)
+                    details = get_hypothesis_details(details_request[0], MODEL_ID)
+                    
+                    st.session_state["hypothesis_statistics"] = details["statistics"]
+                    st.session_state["hypothesis_references"] = details["references"]
+                    st.session_state["hypothesis_outline"] = details["outline"]
                     
-                    st.session_state["hypothesis_statistics"] = statistics
-                    st.session_state["hypothesis_references"] = references
-                    st.session_state["hypothesis_outline"] = outline
+                    # Failed or cut-off requests are retried on the next click
+                    if not any(is_bedrock_error(value) or is_truncated(value) for value in details.values()):
+                        st.session_state["hypothesis_details_request"] = details_request
         
         # Display statistics, references, and outline
         if "hypothesis_statistics" in st.session_state:
@@ -1278,6 +1480,63 @@ with tab3:
                 )
 
 # ==== TAB 4: TEXT EVALUATION ====
+# Function to evaluate text, returns the evaluation of each section
+def evaluate_text_comprehensive(text, model_id, placeholder):
+    text_prefix = document_prefix(text)
+    
+    evaluation = call_bedrock_model_tool(
+        EVALUATION_TOOL_PROMPT,
+        model_id,
+        EVALUATION_TOOL,
+        prefix=text_prefix,
+        validate=validate_evaluation
+    )
+    if evaluation:
+        return format_evaluation(evaluation)
+    
+    # Models without tool use stream the headed text format instead
+    evaluation_text = call_bedrock_model_stream(EVALUATION_PROMPT, model_id, placeholder, prefix=text_prefix)
+    return parse_evaluation_results(evaluation_text)
+
+# Function to check the structured evaluation, returning it with every section
+# as a dict or None when any section is missing or malformed
+def validate_evaluation(evaluation):
+    if not isinstance(evaluation, dict):
+        return None
+    validated = {}
+    for key, _ in EVALUATION_SECTIONS:
+        section = evaluation.get(key)
+        # Some models send each section as a JSON string instead of an object
+        if isinstance(section, str):
+            try:
+                section = json.loads(section, strict=False)
+            except ValueError:
+                return None
+        if not isinstance(section, dict) or "grade" not in section or not str(section.get("corrections", "")).strip():
+            return None
+        validated[key] = section
+    return validated
+
+# Function to turn the structured evaluation into the text shown for each section
+def format_evaluation(evaluation):
+    results = {}
+    for key, _ in EVALUATION_SECTIONS:
+        section = evaluation[key]
+        lines = [f"Grade: {section.get('grade', '?')}/10"]
+        if key == "style":
+            lines.append(f"Text Type Detected: {section.get('text_type', 'Not detected')}")
+            lines.append(f"Style Analysis: {section.get('style_analysis', 'Not provided')}")
+        results[key] = "\n\n".join(lines + [str(section.get("corrections", "")).strip()])
+    return results
+
+# Function to parse evaluation results
+def parse_evaluation_results(evaluation_text):
+    sections = split_sections(evaluation_text, EVALUATION_MARKERS)
+    if is_bedrock_error(evaluation_text) or not sections:
+        # An error or a reply without headings, show the raw response in every box
+        return {key: evaluation_text for key, _ in EVALUATION_SECTIONS}
+    return sections
+
 with tab4:
     st.header("Text Evaluation")
     st.write("Get a comprehensive evaluation of your text with grades and specific corrections.")
@@ -1285,70 +1544,6 @@ with tab4:
     # Input text area
     evaluation_text = st.text_area("Enter your text for evaluation:", height=200, key="evaluation_text_input")
     
-    # Function to evaluate text
-    def evaluate_text_comprehensive(text, model_id):
-        prompt = f"""
-        Evaluate the following text comprehensively across multiple dimensions. Provide grades from 0 to 10 and specific corrections where needed.
-        
-        Text to evaluate:
-        {text}
-        
-        Please provide your evaluation in this exact format:
-        
-        SPELLING EVALUATION:
-        Grade: [0-10]
-        Corrections: [List spelling errors and corrections, or "No spelling errors found"]
-        
-        GRAMMAR EVALUATION:
-        Grade: [0-10]
-        Corrections: [List grammar errors and corrections, or "No grammar errors found"]
-        
-        STYLE EVALUATION:
-        Grade: [0-10]
-        Text Type Detected: [e.g., Academic paper, Report, Blog post, etc.]
-        Style Analysis: [Analysis of writing style and suggestions for improvement]
-        
-        COHERENCE EVALUATION:
-        Grade: [0-10]
-        Corrections: [List coherence issues and suggestions, or "Text is coherent"]
-        
-        OVERALL EVALUATION:
-        Grade: [0-10]
-        Overall Corrections: [Summary of main issues and recommendations for improvement]
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
-    # Function to parse evaluation results
-    def parse_evaluation_results(evaluation_text):
-        sections = {}
-        
-        # Define the sections to extract
-        section_markers = [
-            ("SPELLING EVALUATION:", "spelling"),
-            ("GRAMMAR EVALUATION:", "grammar"),
-            ("STYLE EVALUATION:", "style"),
-            ("COHERENCE EVALUATION:", "coherence"),
-            ("OVERALL EVALUATION:", "overall")
-        ]
-        
-        for marker, key in section_markers:
-            if marker in evaluation_text:
-                start_idx = evaluation_text.find(marker) + len(marker)
-                # Find the next section or end of text
-                next_markers = [m for m, _ in section_markers if m != marker and m in evaluation_text]
-                if next_markers:
-                    next_indices = [evaluation_text.find(m) for m in next_markers if evaluation_text.find(m) > start_idx]
-                    if next_indices:
-                        next_idx = min(next_indices)
-                        sections[key] = evaluation_text[start_idx:next_idx].strip()
-                    else:
-                        sections[key] = evaluation_text[start_idx:].strip()
-                else:
-                    sections[key] = evaluation_text[start_idx:].strip()
-        
-        return sections
-
     # Evaluate text button
     if st.button("Evaluate Text", key="evaluate_text"):
         if not evaluation_text.strip():
@@ -1357,10 +1552,11 @@ with tab4:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
             with st.spinner("Evaluating your text..."):
-                evaluation_results = evaluate_text_comprehensive(evaluation_text, MODEL_ID)
-                parsed_results = parse_evaluation_results(evaluation_results)
-                st.session_state["evaluation_results"] = parsed_results
-                st.session_state["raw_evaluation"] = evaluation_results
+                # A text evaluation streams here, then the parsed sections replace it
+                stream_placeholder = st.empty()
+                evaluation_results = evaluate_text_comprehensive(evaluation_text, MODEL_ID, stream_placeholder)
+                stream_placeholder.empty()
+                st.session_state["evaluation_results"] = evaluation_results
 
     # Display evaluation results
     if "evaluation_results" in st.session_state:
@@ -1369,15 +1565,7 @@ with tab4:
         # Create columns for better layout
         col1, col2 = st.columns(2)
         
-        evaluation_sections = [
-            ("spelling", "Spelling Evaluation"),
-            ("grammar", "Grammar Evaluation"),
-            ("style", "Style Evaluation"),
-            ("coherence", "Coherence Evaluation"),
-            ("overall", "Overall Evaluation")
-        ]
-        
-        for i, (key, title) in enumerate(evaluation_sections):
+        for i, (key, title) in enumerate(EVALUATION_SECTIONS):
             with col1 if i % 2 == 0 else col2:
                 if key in st.session_state["evaluation_results"]:
                     st.text_area(
@@ -1395,6 +1583,15 @@ with tab4:
                     )
 
 # ==== TAB 5: LATEX MAKER ====
+# Function to generate LaTeX code
+def generate_latex_code(text, document_type, model_id, placeholder):
+    prompt = LATEX_PROMPT_TEMPLATE.format(
+        document_type=document_type,
+        document_type_lower=document_type.lower()
+    )
+    
+    return call_bedrock_model_stream(prompt, model_id, placeholder, prefix=document_prefix(text), language="latex")
+
 with tab5:
     st.header("LaTeX Maker")
     st.write("Convert your text into properly formatted LaTeX code for RMarkdown that can be knitted into a PDF.")
@@ -1409,31 +1606,6 @@ with tab5:
     # Input text area
     latex_text = st.text_area("Enter your text to convert to LaTeX:", height=200, key="latex_text_input")
     
-    # Function to generate LaTeX code
-    def generate_latex_code(text, document_type, model_id):
-        prompt = f"""
-        Convert the following text into properly formatted LaTeX code suitable for RMarkdown that can be knitted into a PDF.
-        
-        Document Type: {document_type}
-        
-        Text to convert:
-        {text}
-        
-        Requirements:
-        1. Create a complete LaTeX document structure appropriate for a {document_type.lower()}
-        2. Include proper document class and packages
-        3. Format any equations, numbers, or special formatting appropriately
-        4. Add proper sectioning (\\section, \\subsection, etc.)
-        5. Include title, author, date fields that can be customized
-        6. Use proper LaTeX formatting for lists, emphasis, etc.
-        7. Add comments explaining key formatting choices
-        8. Make it compatible with RMarkdown output: pdf_document
-        
-        Provide only the LaTeX code that can be copied and pasted into RMarkdown.
-        """
-        
-        return call_bedrock_model(prompt, model_id)
-    
     # Generate LaTeX button
     if st.button("Generate LaTeX Code", key="generate_latex"):
         if not latex_text.strip():
@@ -1442,17 +1614,29 @@ with tab5:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
             with st.spinner("Generating LaTeX code..."):
-                latex_code = generate_latex_code(latex_text, latex_text_type, MODEL_ID)
+                # Show the code while it streams, the output box below replaces it
+                stream_placeholder = st.empty()
+                latex_code = generate_latex_code(latex_text, latex_text_type, MODEL_ID, stream_placeholder)
+                stream_placeholder.empty()
                 st.session_state["latex_code"] = latex_code
     
     # Display LaTeX code
     if "latex_code" in st.session_state:
         st.subheader("Generated LaTeX Code")
-        st.text_area(
-            "Copy this code into your RMarkdown document:",
-            value=st.session_state["latex_code"],
-            height=500,
-            key="latex_output"
+        latex_code = st.session_state["latex_code"]
+        # The warning goes above the code so it never ends up in the .tex file
+        if is_truncated(latex_code):
+            st.warning(TRUNCATED_NOTE.strip() + " The LaTeX code below is incomplete.")
+            latex_code = latex_code[:-len(TRUNCATED_NOTE)]
+        # Read-only output, the code block has its own copy button
+        st.caption("Copy this code into your RMarkdown document:")
+        st.code(latex_code, language="latex")
+        st.download_button(
+            "Download .tex",
+            data=latex_code,
+            file_name="document.tex",
+            mime="application/x-tex",
+            key="latex_download"
         )
         
         # Instructions for using the code
@@ -1476,274 +1660,340 @@ with tab5:
         """)
 
 # ==== TAB 6: REFERENCE MAKER ====
-with tab6:
+# Reference fields as (field name, input label, widget key), values are read
+# back from session state by key when the reference is generated
+REF_COMMON_FIELDS = (
+    ("Author(s)", "Author(s):", "ref_author"),
+    ("Title", "Title:", "ref_title"),
+    ("Year", "Year Published:", "ref_year")
+)
+
+REF_ADDITIONAL_FIELDS = (
+    ("DOI", "DOI (if available):", "ref_doi"),
+    ("Notes", "Additional Notes:", "ref_notes")
+)
+
+# Extra fields for each reference type
+JOURNAL_FIELDS = (
+    ("Journal/Conference", "Journal/Conference Name:", "ref_journal"),
+    ("Volume", "Volume:", "ref_volume"),
+    ("Issue", "Issue:", "ref_issue"),
+    ("Pages", "Pages:", "ref_pages")
+)
+
+REF_TYPE_FIELDS = {
+    "Journal Article": JOURNAL_FIELDS,
+    "Book": (
+        ("Publisher", "Publisher:", "ref_publisher"),
+        ("Place Published", "Place Published:", "ref_place"),
+        ("Edition", "Edition (if not first):", "ref_edition")
+    ),
+    "Website": (
+        ("Website Name", "Website Name:", "ref_website"),
+        ("URL", "URL:", "ref_url"),
+        ("Date Accessed", "Date Accessed:", "ref_access_date")
+    ),
+    "Conference Paper": JOURNAL_FIELDS,
+    "Thesis/Dissertation": (
+        ("Institution", "Institution:", "ref_institution"),
+        ("Degree Type", "Degree Type (Master's/PhD):", "ref_degree"),
+        ("Department", "Department:", "ref_department")
+    ),
+    "Report": (
+        ("Organization", "Organization:", "ref_organization"),
+        ("Report Number", "Report Number:", "ref_report_num"),
+        ("Place Published", "Place Published:", "ref_report_place")
+    )
+}
+
+# Fields without which a reference of each type can't be formatted
+REF_REQUIRED_FIELDS = {
+    "Journal Article": ("Author(s)", "Title", "Journal/Conference"),
+    "Book": ("Author(s)", "Title", "Publisher"),
+    "Website": ("Author(s)", "Title", "URL"),
+    "Conference Paper": ("Author(s)", "Title", "Journal/Conference"),
+    "Thesis/Dissertation": ("Author(s)", "Title", "Institution"),
+    "Report": ("Author(s)", "Title", "Organization")
+}
+
+# Every field collected for each reference type, in the order they are sent
+REF_SCHEMA = {
+    ref_type: REF_COMMON_FIELDS + type_fields + REF_ADDITIONAL_FIELDS
+    for ref_type, type_fields in REF_TYPE_FIELDS.items()
+}
+
+# Canonical order of the field names, so prompts list them in one fixed order
+# with the identifying fields first and DOI and notes last
+REF_CANONICAL_ORDER = (
+    "Author(s)", "Title", "Year",
+    "Journal/Conference", "Volume", "Issue", "Pages",
+    "Publisher", "Place Published", "Edition",
+    "Website Name", "URL", "Date Accessed",
+    "Institution", "Degree Type", "Department",
+    "Organization", "Report Number",
+    "DOI", "Notes"
+)
+REF_FIELD_ORDER = {name: position for position, name in enumerate(REF_CANONICAL_ORDER)}
+
+# Function to reduce the fields to a hashable key in canonical order, ignoring
+# blank fields and whitespace-only edits
+def reference_fields_key(fields):
+    return tuple(
+        (name, " ".join(fields[name].split()))
+        for name in sorted(fields, key=lambda name: REF_FIELD_ORDER.get(name, len(REF_FIELD_ORDER)))
+        if fields[name] and fields[name].strip()
+    )
+
+# CSL style names understood by doi.org content negotiation
+DOI_CSL_STYLES = {
+    "APA": "apa",
+    "MLA": "modern-language-association",
+    "Chicago": "chicago-note-bibliography"
+}
+
+# Function to get a formatted reference for a DOI straight from its registry
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_doi_reference(doi, style):
+    # Raises on any failure so that misses are not cached
+    doi = re.sub(r"^(https?://(dx\.)?doi\.org/|doi:\s*)", "", doi.strip(), flags=re.IGNORECASE)
+    request = urllib.request.Request(
+        f"https://doi.org/{urllib.parse.quote(doi, safe='/:;()')}",
+        headers={"Accept": f"text/x-bibliography; style={DOI_CSL_STYLES[style]}"}
+    )
+    with urllib.request.urlopen(request, timeout=3) as response:
+        # Agencies without content negotiation redirect to the publisher's
+        # landing page, whose HTML is not a reference
+        content_type = response.headers.get_content_type()
+        text = response.read().decode("utf-8").strip()
+    if content_type not in ("text/x-bibliography", "text/plain"):
+        raise ValueError(f"Unexpected bibliography content type {content_type}")
+    if not text or text.startswith("<"):
+        raise ValueError("Empty or HTML bibliography response")
+    return text
+
+# Function to build the short, reference-specific part of the prompt
+def build_reference_prompt(ref_type, fields_key):
+    # Create a string with all the provided information
+    field_info = "\n".join(f"{name}: {value}" for name, value in fields_key)
+    
+    return REFERENCE_REQUEST_TEMPLATE.format(ref_type_lower=ref_type.lower(), field_info=field_info)
+
+# Function to generate reference
+def generate_reference(style, ref_type, fields, model_id, placeholder):
+    # Identical requests within the session are answered from its own cache
+    fields_key = reference_fields_key(fields)
+    request = (style, ref_type, fields_key, model_id)
+    reference_cache = st.session_state.setdefault("reference_cache", {})
+    if request in reference_cache:
+        st.session_state["ref_cache_hits"] = st.session_state.get("ref_cache_hits", 0) + 1
+        return reference_cache[request]
+    
+    # With a DOI the registry already has the formatted reference, no model needed
+    doi = dict(fields_key).get("DOI")
+    if doi:
+        try:
+            result = fetch_doi_reference(doi, style)
+            reference_cache[request] = result
+            return result
+        except Exception:
+            # Unknown DOI, no network or a slow registry: let the model format it
+            pass
+    
+    result = call_bedrock_model_stream(
+        build_reference_prompt(ref_type, fields_key),
+        model_id,
+        placeholder,
+        prefix=REFERENCE_PREFIXES[style],
+        language="text"
+    )
+    if not is_bedrock_error(result) and not is_truncated(result):
+        reference_cache[request] = result
+    return result
+
+# Function to read a JSON array of references from a model response
+def parse_reference_list(response):
+    # Models often add fences or a preamble that may itself contain brackets,
+    # so decode from each "[" in turn until one starts a JSON list of strings
+    decoder = json.JSONDecoder(strict=False)
+    for match in re.finditer(r"\[", response):
+        try:
+            data, _ = decoder.raw_decode(response, match.start())
+        except ValueError:
+            continue
+        if isinstance(data, list) and data and all(isinstance(item, str) for item in data):
+            return [item.strip() for item in data if item.strip()]
+    # Not valid JSON, assume one reference per non-blank line
+    return [line.strip() for line in response.splitlines() if line.strip()]
+
+# References per model call, 20 formatted references fit well within the
+# output limit, and the most that can be pasted at once
+REF_BATCH_SIZE = 20
+REF_BATCH_MAX_ITEMS = 100
+
+# Function to format several references with one model call per batch,
+# returning the references and a list of problems to show the user
+def generate_references_batch(style, items, model_id):
+    references = []
+    problems = []
+    for start in range(0, len(items), REF_BATCH_SIZE):
+        batch = items[start:start + REF_BATCH_SIZE]
+        batch_name = f"Lines {start + 1}-{start + len(batch)}"
+        prompt = REFERENCE_BATCH_TEMPLATE.format(count=len(batch), items=json.dumps(batch, ensure_ascii=False, indent=1))
+        result = call_bedrock_model(
+            prompt,
+            model_id,
+            prefix=REFERENCE_PREFIXES[style],
+            max_tokens=200 + 150 * len(batch)
+        )
+        if is_bedrock_error(result):
+            problems.append(result)
+            break
+        if is_truncated(result):
+            # A cut-off array would only yield fragments, skip the whole batch
+            problems.append(f"{batch_name}: the response was cut off at the model's length limit, so they were not formatted.")
+            continue
+        
+        formatted = parse_reference_list(result)
+        if len(formatted) != len(batch):
+            problems.append(f"{batch_name}: expected {len(batch)} references but got {len(formatted)}, check them against your input.")
+        references.extend(formatted)
+    return references, problems
+
+# Function to render the whole reference maker as a fragment, changing the
+# type or generating a reference only reruns this tab instead of the script
+@st.fragment
+def render_reference_maker():
     st.header("Reference Maker")
     st.write("Create properly formatted references in APA, MLA, or Chicago style.")
     
     # Reference style selection
     reference_style = st.selectbox(
         "Select reference style:",
-        ["APA", "MLA", "Chicago"],
+        list(STYLE_RULES),
         key="reference_style"
     )
     
     # Reference type selection
     reference_type = st.selectbox(
         "Select reference type:",
-        ["Journal Article", "Book", "Website", "Conference Paper", "Thesis/Dissertation", "Report"],
+        list(REF_TYPE_FIELDS),
         key="reference_type"
     )
     
-    # Create input fields based on reference type
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        author = st.text_input("Author(s):", key="ref_author")
-        title = st.text_input("Title:", key="ref_title")
-        year = st.text_input("Year Published:", key="ref_year")
-        
-        if reference_type in ["Journal Article", "Conference Paper"]:
-            journal_conference = st.text_input("Journal/Conference Name:", key="ref_journal")
-            volume = st.text_input("Volume:", key="ref_volume")
-            issue = st.text_input("Issue:", key="ref_issue")
-            pages = st.text_input("Pages:", key="ref_pages")
-        
-        if reference_type == "Book":
-            publisher = st.text_input("Publisher:", key="ref_publisher")
-            place_published = st.text_input("Place Published:", key="ref_place")
-            edition = st.text_input("Edition (if not first):", key="ref_edition")
-        
-        if reference_type == "Website":
-            website_name = st.text_input("Website Name:", key="ref_website")
-            url = st.text_input("URL:", key="ref_url")
-            access_date = st.text_input("Date Accessed:", key="ref_access_date")
-    
-    with col2:
-        if reference_type == "Thesis/Dissertation":
-            institution = st.text_input("Institution:", key="ref_institution")
-            degree_type = st.text_input("Degree Type (Master's/PhD):", key="ref_degree")
-            department = st.text_input("Department:", key="ref_department")
-        
-        if reference_type == "Report":
-            organization = st.text_input("Organization:", key="ref_organization")
-            report_number = st.text_input("Report Number:", key="ref_report_num")
-            place_published = st.text_input("Place Published:", key="ref_report_place")
-        
-        # Additional fields for all types
-        doi = st.text_input("DOI (if available):", key="ref_doi")
-        notes = st.text_area("Additional Notes:", key="ref_notes", height=100)
-    
-    # Function to generate reference
-    def generate_reference(style, ref_type, fields, model_id):
-        # Create a string with all the provided information
-        field_info = "\n".join([f"{key}: {value}" for key, value in fields.items() if value.strip()])
-        
-        prompt = f"""
-        Create a properly formatted reference in {style} style for a {ref_type.lower()}.
-        
-        Reference Information:
-        {field_info}
-        
-        Requirements:
-        1. Follow {style} formatting guidelines exactly
-        2. Include all provided information in the correct order
-        3. Use proper punctuation, italics, and formatting
-        4. Include DOI if provided
-        5. Handle missing information appropriately
-        6. Provide only the formatted reference
+    # The inputs sit in a form, so typing in them doesn't rerun the script
+    # until the reference is requested. The type stays outside since it
+    # decides which inputs are shown
+    with st.form("reference_form", clear_on_submit=False):
+        # Create input fields based on reference type
+        col1, col2 = st.columns(2)
         
-        Format the reference exactly as it should appear in a reference list.
-        """
+        with col1:
+            # Common fields followed by the ones for the selected reference type
+            for _, label, key in REF_COMMON_FIELDS + REF_TYPE_FIELDS[reference_type]:
+                st.text_input(label, key=key)
         
-        return call_bedrock_model(prompt, model_id)
-    
-    # Generate reference button
-    if st.button("Generate Reference", key="generate_reference"):
-        if not author.strip() or not title.strip():
-            st.error("Please provide at least author and title information.")
+        with col2:
+            # Additional fields for all types
+            for _, label, key in REF_ADDITIONAL_FIELDS:
+                if key == "ref_notes":
+                    st.text_area(label, key=key, height=100)
+                else:
+                    st.text_input(label, key=key)
+        
+        # Generate reference button
+        submitted = st.form_submit_button("Generate Reference")
+    
+    if submitted:
+        # Collect all field information, skipping the fields left blank
+        fields = {}
+        for name, _, key in REF_SCHEMA[reference_type]:
+            value = st.session_state.get(key, "")
+            if value.strip():
+                fields[name] = value
+        
+        missing = [name for name in REF_REQUIRED_FIELDS[reference_type] if name not in fields]
+        if missing:
+            st.error(f"Please provide the {', '.join(missing)} for this {reference_type.lower()}.")
         elif not MODEL_ID:
             st.error("⚠️ Please select a model in the sidebar first")
         else:
-            # Collect all field information
-            fields = {
-                "Author(s)": author,
-                "Title": title,
-                "Year": year,
-                "DOI": doi,
-                "Notes": notes
-            }
-            
-            # Add type-specific fields
-            if reference_type in ["Journal Article", "Conference Paper"]:
-                fields["Journal/Conference"] = journal_conference
-                fields["Volume"] = volume
-                fields["Issue"] = issue
-                fields["Pages"] = pages
-            elif reference_type == "Book":
-                fields["Publisher"] = publisher
-                fields["Place Published"] = place_published
-                fields["Edition"] = edition
-            elif reference_type == "Website":
-                fields["Website Name"] = website_name
-                fields["URL"] = url
-                fields["Date Accessed"] = access_date
-            elif reference_type == "Thesis/Dissertation":
-                fields["Institution"] = institution
-                fields["Degree Type"] = degree_type
-                fields["Department"] = department
-            elif reference_type == "Report":
-                fields["Organization"] = organization
-                fields["Report Number"] = report_number
-                fields["Place Published"] = place_published
-            
             with st.spinner("Generating reference..."):
-                formatted_reference = generate_reference(reference_style, reference_type, fields, MODEL_ID)
+                stream_placeholder = st.empty()
+                formatted_reference = generate_reference(reference_style, reference_type, fields, MODEL_ID, stream_placeholder)
+                stream_placeholder.empty()
                 st.session_state["formatted_reference"] = formatted_reference
     
     # Display generated reference
     if "formatted_reference" in st.session_state:
         st.subheader("Generated Reference")
-        st.text_area(
-            f"Copy this {reference_style} style reference:",
-            value=st.session_state["formatted_reference"],
-            height=150,
-            key="reference_output"
+        st.caption(f"Copy this {reference_style} style reference:")
+        st.code(st.session_state["formatted_reference"], language=None, wrap_lines=True)
+        st.download_button(
+            "Download reference",
+            data=st.session_state["formatted_reference"],
+            file_name="reference.txt",
+            mime="text/plain",
+            key="reference_download"
         )
         
         st.success("✅ Reference generated successfully! You can copy and paste it into your document.")
+        
+        if st.session_state.get("ref_cache_hits"):
+            st.caption(f"{st.session_state['ref_cache_hits']} repeated request(s) answered from this session's reference cache")
+    
+    # Several references at once, formatted in a single request
+    with st.expander("Format several references at once"):
+        with st.form("reference_batch_form", clear_on_submit=False):
+            st.text_area(
+                "Paste one reference per line (any format, in any style):",
+                key="ref_batch_input",
+                height=200
+            )
+            batch_submitted = st.form_submit_button("Generate References")
+        
+        if batch_submitted:
+            items = [line.strip() for line in st.session_state.get("ref_batch_input", "").splitlines() if line.strip()]
+            if not items:
+                st.error("Please paste at least one reference.")
+            elif len(items) > REF_BATCH_MAX_ITEMS:
+                st.error(f"Please paste at most {REF_BATCH_MAX_ITEMS} references at a time.")
+            elif not MODEL_ID:
+                st.error("⚠️ Please select a model in the sidebar first")
+            else:
+                with st.spinner(f"Generating {len(items)} references..."):
+                    st.session_state["formatted_references"] = generate_references_batch(reference_style, items, MODEL_ID)
+        
+        if "formatted_references" in st.session_state:
+            formatted_references, problems = st.session_state["formatted_references"]
+            for problem in problems:
+                st.warning(problem)
+            if formatted_references:
+                st.caption(f"Copy these {len(formatted_references)} {reference_style} style references:")
+                st.code("\n\n".join(formatted_references), language=None, wrap_lines=True)
+                st.download_button(
+                    "Download references",
+                    data="\n\n".join(formatted_references),
+                    file_name="references.txt",
+                    mime="text/plain",
+                    key="references_download"
+                )
+
+with tab6:
+    render_reference_maker()
 
 # ==== TAB 7: SETUP HELP ====
+SETUP_HELP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setup_help.md")
+
+@st.cache_data(show_spinner=False)
+def load_setup_help():
+    """Setup guide shown in Tab 7, read from disk once"""
+    with open(SETUP_HELP_PATH, encoding="utf-8") as f:
+        return f.read()
+
 with tab7:
     st.header("AWS Bedrock Setup Guide")
     
-    st.markdown("""
-    ## Troubleshooting AWS Bedrock Access
-    
-    If you're getting "AccessDeniedException" errors, follow these steps:
-    
-    ### 1. Verify AWS Region
-    
-    Bedrock is only available in specific regions:
-    - US East (N. Virginia): `us-east-1`
-    - US West (Oregon): `us-west-2`
-    - Europe (Frankfurt): `eu-central-1`
-    - Asia Pacific (Tokyo): `ap-northeast-1`
-    
-    Make sure you select one of these regions in the sidebar.
-    
-    ### 2. Enable Bedrock Model Access
-    
-    You need to request access to the specific models you want to use:
-    
-    1. Go to the [AWS Bedrock console](https://console.aws.amazon.com/bedrock/)
-    2. Click on "Model access" in the left sidebar
-    3. Click "Manage model access"
-    4. Select the models you want to use (Claude, Titan, etc.)
-    5. Click "Request model access"
-    6. Wait for approval (some models are approved instantly)
-    
-    ### 3. Check IAM Permissions
-    
-    Ensure your IAM user/role has these permissions:
-    
-    ```json
-    {
-        "Version": "2012-10-17",
-        "Statement": [
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "bedrock:ListFoundationModels",
-                    "bedrock:GetFoundationModel"
-                ],
-                "Resource": "*"
-            },
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "bedrock-runtime:InvokeModel"
-                ],
-                "Resource": "*"
-            },
-            {
-                "Effect": "Allow",
-                "Action": [
-                    "s3:ListBucket",
-                    "s3:GetObject",
-                    "s3:PutObject",
-                    "s3:CreateBucket",
-                    "s3:ListAllMyBuckets"
-                ],
-                "Resource": [
-                    "arn:aws:s3:::*",
-                    "arn:aws:s3:::*/*"
-                ]
-            }
-        ]
-    }
-    ```
-    
-    ### 4. Configure AWS CLI
-    
-    Make sure your AWS CLI is properly configured:
-    
-    ```bash
-    aws configure --profile recruitment-assistant
-    ```
-    
-    Enter your AWS Access Key ID, Secret Access Key, region (e.g., us-east-1), and output format (json).
-    
-    ### 5. Test Your Access
-    
-    Use these commands to test if you can list Bedrock models:
-    
-    ```bash
-    aws bedrock list-foundation-models --region us-east-1 --profile recruitment-assistant
-    ```
-    
-    Test S3:
-    
-    ```bash
-    aws s3 ls --profile recruitment-assistant
-    ```
-    
-    If these work, you should be able to access these services through this app.
-    
-    ### 6. Application Features
-    
-    This enhanced version includes:
-    
-    **Tab 1 - User Own Text:**
-    - Comprehensive text analysis with sections detection
-    - Detailed corrections for spelling, grammar, coherence, style, and order
-    - Proposed corrected version of your text
-    
-    **Tab 2 - Change Text Tone:**
-    - Advanced tone transformation with customizable parameters
-    - Technical level, formality, and statistics usage controls
-    - Text type selection (report, academic paper, etc.)
-    - Coherence and style analysis of transformed text
-    
-    **Tab 3 - Topic Idea Explorer:**
-    - Hypothesis generation for any topic
-    - Statistical data and key references
-    - Detailed research outline for your chosen hypothesis
-    
-    **Tab 4 - Text Evaluation:**
-    - Comprehensive grading (0-10) for spelling, grammar, style, coherence
-    - Text type detection and analysis
-    - Specific corrections and recommendations
-    
-    **Tab 5 - LaTeX Maker:**
-    - Converts text to LaTeX code for RMarkdown
-    - Multiple document types supported
-    - Ready-to-use code with proper formatting
-    
-    **Tab 6 - Reference Maker:**
-    - Creates properly formatted references
-    - Supports APA, MLA, and Chicago styles
-    - Multiple reference types (articles, books, websites, etc.)
-    """)
+    st.markdown(load_setup_help())
 
 # ===== MAIN APP FOOTER =====
 st.sidebar.markdown("---")
@@ -1752,7 +2002,13 @@ st.sidebar.markdown("Enhanced with comprehensive analysis features")
 
 # Display connection status
 if bedrock_runtime and MODEL_ID:
-    st.sidebar.success(f"✅ Connected to {MODEL_ID}")
+    # The probe is a cheap control-plane lookup, cached so reruns don't repeat
+    # it. An unknown status keeps the plain badge
+    model_status = get_model_status(bedrock, MODEL_ID, AWS_PROFILE, AWS_REGION) if bedrock else None
+    if model_status in (None, "ACTIVE"):
+        st.sidebar.success(f"✅ Connected to {MODEL_ID}")
+    else:
+        st.sidebar.warning(f"⚠️ {MODEL_ID} is {model_status.lower()} on Bedrock")
 else:
     st.sidebar.warning("⚠️ Not connected to Bedrock")
 